@@ -1,38 +1,305 @@
+import os
 import csv
 import json
+import time
+import asyncio
+import argparse
+import tempfile
 import requests
 
 # === CONFIG ===
-CSV_URL = "https://www.fuzzwork.co.uk/dump/latest/staStations.csv"
-OUTPUT_JSON = "stations_full.json"
-AS_MAP = False  # Set to True for stationID -> stationData dict
+BASE_URL = "https://www.fuzzwork.co.uk/dump/latest/"
+TABLES = ["staStations"]  # Fuzzwork dump tables, fetched as <BASE_URL><table>.csv
+OUTPUT_DIR = "."
+OUTPUT_FORMAT = "json"  # "json" (indent=2 document) or "ndjson" (one row per line)
+LAYOUT = "rows"  # "rows" (list), "map" (stationID -> stationData) or "columns" (one array per column)
+MAP_KEYS = {"staStations": "stationID"}  # Key column for the map layout (default: first column)
+TYPED = True  # Coerce columns listed in SCHEMAS; False keeps every field a string
+MAX_CONCURRENT = 4
+TIMEOUT = 60
 
+# staStations keeps its historical output name
+OUTPUT_NAMES = {"staStations": "stations_full"}
 
-def download_csv(url):
+# Column types per table; unlisted columns stay strings
+STATION_SCHEMA = {
+    "stationID": int,
+    "security": float,
+    "dockingCostPerVolume": float,
+    "maxShipVolumeDockable": float,
+    "officeRentalCost": float,
+    "operationID": int,
+    "stationTypeID": int,
+    "corporationID": int,
+    "solarSystemID": int,
+    "constellationID": int,
+    "regionID": int,
+    "x": float,
+    "y": float,
+    "z": float,
+    "reprocessingEfficiency": float,
+    "reprocessingStationsTake": float,
+    "reprocessingHangarFlag": int,
+}
+SCHEMAS = {"staStations": STATION_SCHEMA}
+NULL_VALUES = ("", "None", "\\N")
+
+
+def output_path(table, fmt=OUTPUT_FORMAT, directory=OUTPUT_DIR):
+    name = OUTPUT_NAMES.get(table, table)
+    return os.path.join(directory, f"{name}.{fmt}")
+
+
+def load_meta(path):
+    """ETag/Last-Modified recorded for an output by its last successful import"""
+    try:
+        with open(path + ".meta.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_meta(path, meta):
+    with open(path + ".meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def download_csv(url, meta=None):
+    """Open url as a streamed response; None if the server answers 304 Not Modified.
+
+    With meta from a previous import, the request carries If-None-Match /
+    If-Modified-Since so an unchanged dump is not downloaded again.
+    """
     print(f"Downloading: {url}")
-    response = requests.get(url)
+    headers = {}
+    if meta and meta.get("url") == url:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    response = requests.get(url, headers=headers, stream=True, timeout=TIMEOUT)
+    if response.status_code == 304:
+        response.close()
+        return None
     response.raise_for_status()
-    return response.text.splitlines()
+    return response
 
 
-def convert_csv_to_json(csv_lines, as_map=False):
-    reader = csv.DictReader(csv_lines)
+def iter_csv_lines(response, chunk_size=64 * 1024):
+    """Decoded text lines (with line endings) from a streamed response, as they arrive"""
+    # requests assumes ISO-8859-1 for any text/* reply without a charset;
+    # the dumps are UTF-8 unless the server says otherwise
+    if "charset=" not in response.headers.get("Content-Type", "").lower():
+        response.encoding = "utf-8"
+    pending = ""
+    for chunk in response.iter_content(chunk_size, decode_unicode=True):
+        lines = (pending + chunk).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+def coerce_rows(rows, schema):
+    """Yield rows with schema columns converted once; nulls become None"""
+    converters = list(schema.items())
+    for row in rows:
+        for column, convert in converters:
+            value = row.get(column)
+            if value is None:
+                continue
+            if value in NULL_VALUES:
+                row[column] = None
+                continue
+            try:
+                row[column] = convert(value)
+            except ValueError:
+                # Integer columns occasionally arrive as "123.0"
+                if convert is not int:
+                    raise ValueError(f"{column}={value!r} is not a {convert.__name__}")
+                row[column] = int(float(value))
+        yield row
+
+
+def _indented(value, prefix="  "):
+    # Matches json.dump(..., indent=2) for a value nested one level deep
+    return json.dumps(value, indent=2).replace("\n", "\n" + prefix)
+
+
+def _write_columns(rows, f):
+    # One compact array per column, one column per line
+    columns = {}
+    count = 0
+    for row in rows:
+        if not columns:
+            columns = {column: [] for column in row}
+        for column, values in columns.items():
+            values.append(row[column])
+        count += 1
+    f.write("{")
+    for i, (column, values) in enumerate(columns.items()):
+        f.write(",\n  " if i else "\n  ")
+        f.write(json.dumps(column) + ": " + json.dumps(values, separators=(",", ":")))
+    f.write("\n}" if columns else "}")
+    return count
 
-    if as_map:
-        data = {row["stationID"]: row for row in reader}
-    else:
-        data = list(reader)
 
-    return data
+def write_rows(rows, filename, fmt="json", layout="rows", key="stationID"):
+    """Write rows to filename as they are produced; returns the row count.
 
+    "json" output with the rows/map layouts is byte-identical to
+    json.dump(..., indent=2) of the full list or key -> row map; the columns
+    layout has to collect every row first and writes one array per column.
+    "ndjson" writes one compact row per line. The file is written beside
+    filename and renamed into place, so a failed download never leaves a
+    truncated output.
+    """
+    tmp = filename + ".tmp"
+    count = 0
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            if fmt == "ndjson":
+                for row in rows:
+                    f.write(json.dumps(row, separators=(",", ":")))
+                    f.write("\n")
+                    count += 1
+            elif layout == "columns":
+                count = _write_columns(rows, f)
+            else:
+                as_map = layout == "map"
+                f.write("{" if as_map else "[")
+                for row in rows:
+                    f.write(",\n  " if count else "\n  ")
+                    if as_map:
+                        f.write(json.dumps(str(row[key])) + ": ")
+                    f.write(_indented(row))
+                    count += 1
+                f.write(("\n" if count else "") + ("}" if as_map else "]"))
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
 
-def save_json(data, filename):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-    print(f"Saved JSON to {filename}")
+
+def import_table(table, base_url=BASE_URL, fmt=OUTPUT_FORMAT, layout=LAYOUT,
+                 typed=TYPED, directory=OUTPUT_DIR, force=False):
+    """Stream one dump table to JSON/NDJSON; returns the row count, or None if unchanged"""
+    url = base_url.rstrip("/") + f"/{table}.csv"
+    filename = output_path(table, fmt, directory)
+    settings = {"layout": layout, "typed": typed}
+    meta = {} if force or not os.path.exists(filename) else load_meta(filename)
+    if meta.get("settings", settings) != settings:
+        meta = {}  # Same download, different output shape
+
+    response = download_csv(url, meta)
+    if response is None:
+        print(f"Not modified: {url} (kept {filename})")
+        return None
+    with response:
+        rows = csv.DictReader(iter_csv_lines(response))
+        key = MAP_KEYS.get(table) or (rows.fieldnames or [None])[0]
+        if typed and table in SCHEMAS:
+            rows = coerce_rows(rows, SCHEMAS[table])
+        count = write_rows(rows, filename, fmt, layout, key)
+        save_meta(filename, {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "rows": count,
+            "settings": settings,
+        })
+    print(f"Saved {count} rows to {filename}")
+    return count
+
+
+async def import_tables(tables, max_concurrent=MAX_CONCURRENT, **options):
+    """Fetch several dump tables at once; returns {table: row count or None}"""
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def run(table):
+        async with semaphore:
+            return await asyncio.to_thread(import_table, table, **options)
+
+    counts = await asyncio.gather(*(run(table) for table in tables))
+    return dict(zip(tables, counts))
+
+
+def benchmark_layouts(csv_path, repeat=5, key="stationID", schema=STATION_SCHEMA):
+    """Compare size and load time of the string output against the typed layouts.
+
+    Load time for the string output includes the int/float parsing every
+    consumer of it has to do; the typed layouts are used as loaded.
+    """
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        raw = list(csv.DictReader(f))
+
+    def reparse(data):
+        return list(coerce_rows((dict(row) for row in data), schema))
+
+    variants = [
+        ("strings (rows)", False, "rows", reparse),
+        ("typed rows", True, "rows", None),
+        ("typed map", True, "map", None),
+        ("typed columns", True, "columns", None),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, typed, layout, post in variants:
+            path = os.path.join(tmp, name.replace(" ", "_") + ".json")
+            rows = (dict(row) for row in raw)
+            write_rows(coerce_rows(rows, schema) if typed else rows, path, "json", layout, key)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if post:
+                    post(data)
+                timings.append(time.perf_counter() - start)
+            results.append({"layout": name, "bytes": os.path.getsize(path),
+                            "load_seconds": min(timings)})
+
+    base = results[0]
+    print(f"{'layout':<16}{'size':>12}{'load':>11}{'vs strings':>12}")
+    for r in results:
+        print(f"{r['layout']:<16}{r['bytes'] / 1e6:>10.2f}MB{r['load_seconds'] * 1000:>9.1f}ms"
+              f"{base['load_seconds'] / r['load_seconds']:>11.2f}x")
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import Fuzzwork SDE dump tables as JSON.")
+    parser.add_argument("tables", nargs="*", default=TABLES,
+                        help=f"dump tables to fetch (default: {' '.join(TABLES)})")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="dump location, e.g. a local mirror or test server")
+    parser.add_argument("--format", choices=("json", "ndjson"), default=OUTPUT_FORMAT)
+    parser.add_argument("--layout", choices=("rows", "map", "columns"), default=LAYOUT,
+                        help="list of rows, key -> row map, or one array per column (json only)")
+    parser.add_argument("--map", dest="layout", action="store_const", const="map",
+                        help="shorthand for --layout map")
+    parser.add_argument("--raw", action="store_true",
+                        help="keep every field a string instead of applying SCHEMAS")
+    parser.add_argument("--out-dir", default=OUTPUT_DIR)
+    parser.add_argument("-j", "--jobs", type=int, default=MAX_CONCURRENT,
+                        help="tables fetched concurrently")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore ETag/Last-Modified and download again")
+    parser.add_argument("--benchmark", metavar="CSV",
+                        help="compare load times of the output layouts for a local staStations.csv")
+    args = parser.parse_args(argv)
+    if args.format == "ndjson" and args.layout != "rows":
+        parser.error("--format ndjson writes one row per line; use the rows layout")
+    return args
 
 
 if __name__ == "__main__":
-    csv_lines = download_csv(CSV_URL)
-    json_data = convert_csv_to_json(csv_lines, AS_MAP)
-    save_json(json_data, OUTPUT_JSON)
+    args = parse_args()
+    if args.benchmark:
+        benchmark_layouts(args.benchmark)
+    else:
+        asyncio.run(import_tables(args.tables, max_concurrent=args.jobs, base_url=args.base_url,
+                                  fmt=args.format, layout=args.layout, typed=not args.raw,
+                                  directory=args.out_dir, force=args.force))
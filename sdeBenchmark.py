@@ -0,0 +1,468 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import tempfile
+import gc
+import tracemalloc
+import yaml
+
+# Dump with libyaml when available; generating 500k types is otherwise slow
+try:
+    from yaml import CSafeDumper as YAMLDumper
+except ImportError:
+    from yaml import SafeDumper as YAMLDumper
+
+# ─── Paths ────────────────────────────────────────────────
+EXTRACTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sdeDataExtractor.py")
+BASELINES_PATH = "benchmark_baselines.json"
+GENERATOR_VERSION = 1  # Bump when the synthetic layout changes, so cached trees are rebuilt
+
+STAGES = ("locations", "market", "resources")
+LANGUAGES = ("de", "en", "es", "fr", "ja", "ru", "zh")
+
+# Mirrors the IDs the extractor keys on (see sdeDataExtractor.py)
+PLEX_TYPE_ID = 44992
+PLEX_REGION_ID = 19000001
+ASTEROID_CATEGORY_ID = 25
+ICE_CATEGORY_ID = 87
+GAS_CATEGORY_ID = 49
+MOON_ORE_GROUP_IDS = (1920, 1921, 1922, 1923)
+MINERAL_TYPE_IDS = list(range(34, 41))
+
+ORE_PREFIXES = ["", "Concentrated ", "Dense ", "Massive "]
+ICE_PREFIXES = ["", "Enriched ", "Pristine "]
+WORDS = ["Arkonor", "Bistot", "Crokite", "Hedbergite", "Jaspet", "Kernite", "Omber",
+         "Pyroxeres", "Scordite", "Spodumain", "Veldspar", "Mercoxit", "Gneiss", "Ochre",
+         "Hemorphite", "Plagioclase", "Zeolites", "Sylvite", "Cobaltite", "Titanite"]
+
+# ─── Synthetic SDE Generator ──────────────────────────────
+
+
+def _localized(text):
+    return {lang: text if lang == "en" else f"{text} [{lang}]" for lang in LANGUAGES}
+
+
+def _dump(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.dump(data, f, Dumper=YAMLDumper, allow_unicode=True)
+
+
+def generate_fsd(root, type_count, rnd):
+    """Write types, groups, typeMaterials, marketGroups and iconIDs with a realistic shape"""
+    fsd = os.path.join(root, "sde", "fsd")
+
+    groups = {
+        18: {"categoryID": 4, "name": _localized("Mineral"), "published": True},
+        450: {"categoryID": ASTEROID_CATEGORY_ID, "name": _localized("Asteroid"), "published": True},
+        465: {"categoryID": ICE_CATEGORY_ID, "name": _localized("Ice"), "published": True},
+        711: {"categoryID": GAS_CATEGORY_ID, "name": _localized("Harvestable Cloud"), "published": True},
+    }
+    for gid in MOON_ORE_GROUP_IDS:
+        groups[gid] = {"categoryID": ASTEROID_CATEGORY_ID,
+                       "name": _localized(f"Moon Asteroid {gid}"), "published": True}
+    filler_groups = list(range(2000, 2000 + max(10, type_count // 200)))
+    for gid in filler_groups:
+        groups[gid] = {"categoryID": 7, "name": _localized(f"Group {gid}"), "published": True}
+
+    icon_ids = {icon_id: {"iconFile": f"res:/ui/texture/icons/{icon_id}_64_1.png",
+                          "description": f"icon {icon_id}"}
+                for icon_id in range(1, max(50, type_count // 50))}
+
+    # Market groups: a few roots, each a shallow tree whose leaves hold types
+    market_groups = {}
+    leaves = []
+    next_mgid = 1
+    for _ in range(max(4, type_count // 5000)):
+        root_id = next_mgid
+        next_mgid += 1
+        market_groups[root_id] = {"nameID": _localized(f"Category {root_id}"),
+                                  "hasTypes": False, "iconID": rnd.choice(list(icon_ids))}
+        parents = [root_id]
+        for depth in range(3):
+            children = []
+            for parent in parents:
+                for _ in range(rnd.randint(2, 4)):
+                    mgid = next_mgid
+                    next_mgid += 1
+                    market_groups[mgid] = {"nameID": _localized(f"Group {mgid}"),
+                                           "parentGroupID": parent, "hasTypes": depth == 2,
+                                           "iconID": rnd.choice(list(icon_ids))}
+                    children.append(mgid)
+            parents = children
+        leaves.extend(parents)
+
+    types = {}
+    materials = {}
+
+    def add_type(type_id, name, group_id, volume, refined=None):
+        types[type_id] = {
+            "groupID": group_id,
+            "name": _localized(name),
+            "description": _localized(f"{name} " + "lorem ipsum " * rnd.randint(5, 40)),
+            "iconID": rnd.choice(list(icon_ids)),
+            "marketGroupID": rnd.choice(leaves),
+            "mass": round(rnd.uniform(1, 1e6), 2),
+            "portionSize": 1,
+            "published": rnd.random() > 0.1,
+            "volume": volume,
+        }
+        if refined:
+            materials[type_id] = {"materials": [
+                {"materialTypeID": mtid, "quantity": rnd.randint(1, 500)} for mtid in refined]}
+
+    for i, mtid in enumerate(MINERAL_TYPE_IDS):
+        add_type(mtid, f"Mineral {i}", 18, 0.01)
+        types[mtid]["published"] = True
+    add_type(PLEX_TYPE_ID, "PLEX", filler_groups[0], 0.01)
+
+    next_type_id = 100000
+    for word in WORDS:
+        for prefix in ORE_PREFIXES + ["Compressed "]:
+            add_type(next_type_id, f"{prefix}{word}", 450, 0.1,
+                     rnd.sample(MINERAL_TYPE_IDS, 3))
+            next_type_id += 1
+        for prefix in ICE_PREFIXES:
+            add_type(next_type_id, f"{prefix}{word} Ice", 465, 1000.0,
+                     rnd.sample(MINERAL_TYPE_IDS, 2))
+            next_type_id += 1
+        add_type(next_type_id, f"{word} Moon Ore", rnd.choice(MOON_ORE_GROUP_IDS),
+                 10.0, rnd.sample(MINERAL_TYPE_IDS, 2))
+        next_type_id += 1
+        add_type(next_type_id, f"{word} Cytoserocin", 711, 10.0)
+        next_type_id += 1
+
+    while len(types) < type_count:
+        name = f"{rnd.choice(WORDS)} Module {next_type_id}"
+        add_type(next_type_id, name, rnd.choice(filler_groups), round(rnd.uniform(0.1, 500), 2),
+                 rnd.sample(MINERAL_TYPE_IDS, 2) if rnd.random() < 0.3 else None)
+        next_type_id += 1
+
+    _dump(os.path.join(fsd, "types.yaml"), types)
+    _dump(os.path.join(fsd, "groups.yaml"), groups)
+    _dump(os.path.join(fsd, "typeMaterials.yaml"), materials)
+    _dump(os.path.join(fsd, "marketGroups.yaml"), market_groups)
+    _dump(os.path.join(fsd, "iconIDs.yaml"), icon_ids)
+
+
+def generate_universe(root, system_count, rnd):
+    """Write the universe tree and staStations.yaml; about a quarter of systems get stations"""
+    universe = os.path.join(root, "sde", "universe")
+    region_count = max(2, system_count // 80)
+    systems = []  # (system_id, dirpath, region_id, constellation_id)
+
+    next_constellation_id = 20000001
+    next_system_id = 30000001
+    for r in range(region_count + 1):
+        # The last region is the hidden PLEX region
+        hidden = r == region_count
+        region_id = PLEX_REGION_ID if hidden else 10000001 + r
+        region_dir = os.path.join(universe, "hidden" if hidden else "eve",
+                                  "PLEXRegion" if hidden else f"Region{r:03d}")
+        _dump(os.path.join(region_dir, "region.yaml"),
+              {"regionID": region_id, "nameID": 60000000 + r, "center": [0.0, 0.0, 0.0]})
+        region_systems = 4 if hidden else max(1, system_count // region_count)
+        for c in range(max(1, region_systems // 7)):
+            constellation_id = next_constellation_id
+            next_constellation_id += 1
+            constellation_dir = os.path.join(region_dir, f"Constellation{constellation_id}")
+            _dump(os.path.join(constellation_dir, "constellation.yaml"),
+                  {"constellationID": constellation_id, "center": [0.0, 0.0, 0.0], "radius": 1.0e17})
+            for _ in range(7 if not hidden else 4):
+                system_id = next_system_id
+                next_system_id += 1
+                systems.append((system_id, os.path.join(constellation_dir, f"System{system_id}"),
+                                region_id, constellation_id))
+
+    # Stargates: a ring through every system plus random shortcuts, both directions
+    gate_links = {system_id: [] for system_id, _, _, _ in systems}
+    ids = [system_id for system_id, _, _, _ in systems]
+    edges = {(ids[i], ids[(i + 1) % len(ids)]) for i in range(len(ids))}
+    for _ in range(len(ids) // 3):
+        a, b = rnd.sample(ids, 2)
+        edges.add((a, b))
+    next_gate_id = 50000001
+    for a, b in sorted(edges):
+        gate_links[a].append((next_gate_id, next_gate_id + 1))
+        gate_links[b].append((next_gate_id + 1, next_gate_id))
+        next_gate_id += 2
+
+    stations = []
+    next_station_id = 60000001
+    for index, (system_id, system_dir, region_id, constellation_id) in enumerate(systems):
+        planets = {}
+        for p in range(rnd.randint(3, 10)):
+            planet_id = 40000000 + index * 100 + p * 10
+            planets[planet_id] = {
+                "celestialIndex": p + 1,
+                "position": [rnd.uniform(-1e12, 1e12) for _ in range(3)],
+                "radius": rnd.randint(1000000, 90000000),
+                "typeID": 11,
+                "moons": {planet_id + m: {"position": [rnd.uniform(-1e9, 1e9) for _ in range(3)],
+                                          "radius": rnd.randint(100000, 5000000), "typeID": 14}
+                          for m in range(1, rnd.randint(1, 9))},
+                "asteroidBelts": {planet_id + 9: {"position": [0.0, 0.0, 0.0], "typeID": 15}},
+            }
+        security = round(rnd.uniform(-1.0, 1.0), 6)
+        _dump(os.path.join(system_dir, "solarsystem.yaml"), {
+            "border": False,
+            "center": [rnd.uniform(-1e17, 1e17) for _ in range(3)],
+            "hub": False,
+            "luminosity": 0.1,
+            "planets": planets,
+            "radius": 1.0e12,
+            "security": security,
+            "securityClass": "B",
+            "solarSystemID": system_id,
+            "solarSystemNameID": 270000000 + index,
+            "stargates": {gate: {"destination": destination, "typeID": 16,
+                                 "position": [0.0, 0.0, 0.0]}
+                          for gate, destination in gate_links[system_id]},
+            "sunTypeID": 6,
+        })
+        if region_id != PLEX_REGION_ID and rnd.random() < 0.25:
+            for _ in range(rnd.randint(1, 4)):
+                stations.append({
+                    "constellationID": constellation_id,
+                    "corporationID": 1000000 + rnd.randint(1, 200),
+                    "dockingCostPerVolume": 0.0,
+                    "maxShipVolumeDockable": 50000000.0,
+                    "officeRentalCost": 10000,
+                    "operationID": rnd.randint(1, 60),
+                    "regionID": region_id,
+                    "reprocessingEfficiency": 0.5,
+                    "reprocessingHangarFlag": 4,
+                    "reprocessingStationsTake": 0.05,
+                    "security": security,
+                    "solarSystemID": system_id,
+                    "stationID": next_station_id,
+                    "stationName": f"System{system_id} - Station {next_station_id}",
+                    "stationTypeID": 1531,
+                    "x": rnd.uniform(-1e12, 1e12),
+                    "y": rnd.uniform(-1e12, 1e12),
+                    "z": rnd.uniform(-1e12, 1e12),
+                })
+                next_station_id += 1
+
+    _dump(os.path.join(root, "sde", "bsd", "staStations.yaml"), stations)
+
+
+def generate_sde(root, type_count=10000, system_count=1000, seed=0):
+    """Build a synthetic SDE under root/sde, reusing an existing tree with the same parameters"""
+    params = {"types": type_count, "systems": system_count, "seed": seed,
+              "version": GENERATOR_VERSION}
+    marker = os.path.join(root, "sde", "synthetic.json")
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == params:
+                print(f"♻️  Reusing synthetic SDE in {root}")
+                return
+    print(f"🏗  Generating synthetic SDE ({type_count} types, {system_count} systems) in {root}...")
+    started = time.perf_counter()
+    rnd = random.Random(seed)
+    generate_fsd(root, type_count, rnd)
+    generate_universe(root, system_count, rnd)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    print(f"✅ Generated in {time.perf_counter() - started:.1f}s")
+
+# ─── Benchmark Harness ────────────────────────────────────
+
+
+def _tree_bytes(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(dirpath, name)) for name in filenames)
+    return total
+
+
+def _stage_input_bytes(root):
+    fsd = os.path.join(root, "sde", "fsd")
+    size = lambda name: os.path.getsize(os.path.join(fsd, name))
+    return {
+        "locations": _tree_bytes(os.path.join(root, "sde", "universe")) +
+        os.path.getsize(os.path.join(root, "sde", "bsd", "staStations.yaml")),
+        "market": size("types.yaml") + size("marketGroups.yaml") + size("iconIDs.yaml"),
+        "resources": size("types.yaml") + size("typeMaterials.yaml") + size("groups.yaml"),
+    }
+
+
+def run_stage(root, stage, jobs, use_cache=False):
+    """Run one extractor target in a fresh process; returns wall seconds and peak RSS in MB"""
+    cmd = [sys.executable, EXTRACTOR_PATH, stage, "--force", "--jobs", str(jobs)]
+    if not use_cache:
+        cmd.append("--no-cache")
+    # stderr goes to a file: nothing reads a pipe while wait4 blocks, so a
+    # chatty child could fill one and never exit
+    with tempfile.TemporaryFile() as errors:
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=root, stdout=subprocess.DEVNULL, stderr=errors)
+        peak_rss_mb = None
+        if hasattr(os, "wait4"):
+            # wait4 reports this child's own rusage; RUSAGE_CHILDREN would mix stages
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is KB on Linux, bytes on macOS
+            scale = 1024 ** 2 if sys.platform == "darwin" else 1024
+            peak_rss_mb = usage.ru_maxrss / scale
+        else:
+            proc.wait()
+        wall = time.perf_counter() - started
+        errors.seek(0)
+        stderr = errors.read().decode("utf-8", "replace")
+    if proc.returncode != 0:
+        raise RuntimeError(f"{stage} failed with exit code {proc.returncode}:\n{stderr}")
+    return wall, peak_rss_mb
+
+
+def run_benchmarks(root, stages, jobs, repeat=1, use_cache=False):
+    input_bytes = _stage_input_bytes(root)
+    results = {}
+    for stage in stages:
+        # Best of N damps scheduler noise; peak RSS is the worst seen
+        walls, rss = [], []
+        for _ in range(repeat):
+            wall, peak = run_stage(root, stage, jobs, use_cache)
+            walls.append(wall)
+            if peak is not None:
+                rss.append(peak)
+        wall = min(walls)
+        results[stage] = {
+            "wall_s": round(wall, 3),
+            "peak_rss_mb": round(max(rss), 1) if rss else None,
+            "input_mb": round(input_bytes[stage] / 1024 ** 2, 2),
+            "throughput_mb_s": round(input_bytes[stage] / 1024 ** 2 / max(wall, 1e-9), 2),
+        }
+        r = results[stage]
+        rss_text = f"{r['peak_rss_mb']:.0f} MB" if r["peak_rss_mb"] is not None else "n/a"
+        print(f"⏱  {stage:<10} {r['wall_s']:8.2f}s  peak RSS {rss_text:>8}  "
+              f"{r['throughput_mb_s']:7.2f} MB/s over {r['input_mb']:.1f} MB")
+    return results
+
+
+def benchmark_type_memory(root):
+    """Compare heap held by full types.yaml documents against compact TypeRecords"""
+    from sdeDataExtractor import YAMLLoader, compact_types
+
+    with open(os.path.join(root, "sde", "fsd", "types.yaml"), "r", encoding="utf-8") as f:
+        text = f.read()
+
+    gc.collect()
+    tracemalloc.start()
+    raw = yaml.load(text, Loader=YAMLLoader)
+    raw_mb = tracemalloc.get_traced_memory()[0] / 1024 ** 2
+    records = compact_types(raw)
+    del raw
+    gc.collect()
+    compact_mb = tracemalloc.get_traced_memory()[0] / 1024 ** 2
+    tracemalloc.stop()
+
+    result = {
+        "types": len(records),
+        "full_mb": round(raw_mb, 2),
+        "compact_mb": round(compact_mb, 2),
+        "reduction": round(raw_mb / max(compact_mb, 1e-9), 1),
+    }
+    print(f"🧠 types.yaml in memory: full documents {result['full_mb']:.1f} MB, "
+          f"TypeRecords {result['compact_mb']:.1f} MB ({result['reduction']}x smaller, "
+          f"{result['types']} types)")
+    return result
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """Return a list of human-readable regressions beyond threshold (fractional)"""
+    regressions = []
+    for stage, current in results.items():
+        previous = baseline.get(stage)
+        if not previous:
+            continue
+        for metric in ("wall_s", "peak_rss_mb"):
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            if after > before * (1 + threshold):
+                regressions.append(f"{stage} {metric}: {before} → {after} "
+                                   f"(+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(path, baselines):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+    print(f"💾 Saved baselines to {path}")
+
+# ─── Main CLI ──────────────────────────────────────────────
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the SDE extractors against a synthetic SDE.")
+    parser.add_argument("--types", type=int, default=10000, help="number of types to generate")
+    parser.add_argument("--systems", type=int, default=1000, help="number of solar systems to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sde-dir", help="where to generate (and reuse) the synthetic SDE; "
+                                          "defaults to a temporary directory")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage; the fastest counts")
+    parser.add_argument("--cache", action="store_true",
+                        help="measure warm runs with the parsed YAML cache enabled")
+    parser.add_argument("--memory", action="store_true",
+                        help="also compare in-memory size of full type documents vs TypeRecords")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the baseline for its scale")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown/growth before failing (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scale = f"types={args.types},systems={args.systems},seed={args.seed}"
+
+    with tempfile.TemporaryDirectory(prefix="sde-bench-") as tmp:
+        root = os.path.abspath(args.sde_dir or tmp)
+        generate_sde(root, args.types, args.systems, args.seed)
+        if args.cache:
+            # Warm the cache so the measured runs deserialize instead of parse
+            run_benchmarks(root, args.stages, args.jobs, 1, use_cache=True)
+        print(f"\n📊 Benchmarking {scale}")
+        results = run_benchmarks(root, args.stages, args.jobs, args.repeat, args.cache)
+        if args.memory:
+            results["type_memory"] = benchmark_type_memory(root)
+
+    key = scale + (",cache" if args.cache else "")
+    baselines = load_baselines(args.baselines)
+    if args.save_baseline:
+        baselines[key] = results
+        save_baselines(args.baselines, baselines)
+        return 0
+
+    if key not in baselines:
+        print(f"ℹ️  No baseline for {key}; run with --save-baseline to record one")
+        return 0
+
+    regressions = compare_to_baseline(results, baselines[key], args.threshold)
+    if regressions:
+        print("\n❌ Regressions:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print("\n✅ Within baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,51 @@
 import os
+import sys
+import shutil
+import argparse
 import yaml
 import json
+import pickle
+import hashlib
+import gzip
+import io
 import multiprocessing as mp
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import threading
+import time
+import re
+import itertools
+from collections import deque
+import cProfile
+from contextlib import contextmanager
+from functools import wraps
+
+# A module of its own, so cached records unpickle from a script run or an import alike
+from sdeRecords import TypeRecord
+
+try:
+    import resource  # Unix only; peak RSS is left out elsewhere
+except ImportError:
+    resource = None
+
+# Optional: the sparse refine matrix needs numpy
+try:
+    import sdeReprocessing
+except ImportError:
+    sdeReprocessing = None
+
+# Optional: --zstd outputs need zstandard
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Prefer the libyaml C parser; fall back to pure Python when PyYAML was built without it
+try:
+    from yaml import CSafeLoader as YAMLLoader
+    YAML_BACKEND = "libyaml"
+except ImportError:
+    from yaml import SafeLoader as YAMLLoader
+    YAML_BACKEND = "pure-python"
 
 # ─── Paths ────────────────────────────────────────────────
 SDE_ROOT = "sde"
@@ -23,41 +65,431 @@ GAS_GROUP_ID = 883  # "Harvestable Clouds"
 GAS_CATEGORY_ID = 49  # Gas category
 MOON_ORE_GROUP_IDS = {1920, 1921, 1922, 1923}  # All moon ore groups
 
-# Common compressed ore keywords to filter out
-COMPRESSED_KEYWORDS = ["compressed", "compact"]
+# Compressed keywords and variant prefixes/suffixes for ore, ice and moon ore names
+ORE_VARIANTS_PATH = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "ore_variants.json")
+
+# ─── JSON Output ───────────────────────────────────────────
+JSON_COMPACT = False  # --compact: no indentation, minimal separators
+JSON_COMPRESSION = None  # None, "gzip" (--gzip) or "zstd" (--zstd, needs zstandard)
+JSON_EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+MARKET_FLAT = False  # --flat: also write market_flat.json (groups as a list with parentGroupID)
+ICON_ATLAS = False  # --icon-atlas: pack icons/ into atlases; market.json then names the manifest
+MARKET_SHARD_DEPTH = 0  # --shard [DEPTH]: also split market.json into per-group shards at this depth
+MARKET_SHARD_DIR = "market_shards"
+MARKET_INDEX_PATH = "market_index.json"
+
+# ─── Parsed YAML Cache ────────────────────────────────────
+YAML_CACHE_DIR = ".sde_cache"
+YAML_CACHE_ENABLED = True  # --no-cache turns this off for a run
+YAML_CACHE_MAX_BYTES = 4 * 1024 ** 3  # Least recently used entries go first
+
+# types.yaml is parsed in batches of this many entries instead of as one document
+STREAM_TYPES = True  # --no-stream parses it whole
+STREAM_BATCH_ENTRIES = 256
+
+# Process pools are started from the run_targets worker threads; forking a
+# threaded process can copy a lock another thread holds, so workers come
+# from a fork server (or are spawned where there is none)
+POOL_CONTEXT = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+
+# Files at least this big get their own throughput line; smaller ones only count in the summary
+YAML_REPORT_MIN_BYTES = 1024 ** 2
+YAML_STATS = {}  # backend -> {"files", "bytes", "seconds"}
+_yaml_stats_lock = threading.Lock()
+
+# ─── Instrumentation ───────────────────────────────────────
+PROFILE_REPORT_PATH = "extract_profile.json"
+PROFILE_DIR = "profiles"  # --profile writes one .pstats file per target here
+# stage -> {"calls", "wall_s", "cpu_s", "bytes_read", "bytes_written", "process_peak_rss_mb"};
+# ru_maxrss only has a process-wide high-water mark, so a stage records
+# the process peak as of its end, not its own footprint
+STAGE_STATS = {}
+_stage_stats_lock = threading.Lock()
+_stage_local = threading.local()
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 ** 2 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _new_stage_stats():
+    return {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+            "bytes_read": 0, "bytes_written": 0, "process_peak_rss_mb": None}
+
+
+@contextmanager
+def stage(name):
+    """Record wall time, thread CPU time, I/O and the process peak RSS for a named stage.
+
+    Re-entering a stage that is already active on this thread (a nested
+    call of the same instrumented function) only counts the call, so
+    times stay inclusive and never double up.
+    """
+    stack = _stage_local.__dict__.setdefault("stack", [])
+    outermost = name not in stack
+    stack.append(name)
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        stack.pop()
+        with _stage_stats_lock:
+            stats = STAGE_STATS.setdefault(name, _new_stage_stats())
+            stats["calls"] += 1
+            if outermost:
+                stats["wall_s"] += time.perf_counter() - wall
+                stats["cpu_s"] += time.thread_time() - cpu
+                rss = _peak_rss_mb()
+                if rss is not None:
+                    stats["process_peak_rss_mb"] = max(stats["process_peak_rss_mb"] or 0.0, rss)
+
+
+def instrumented(name):
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_io(read=0, written=0):
+    """Charge bytes to every stage active on this thread (once per stage name)"""
+    stack = getattr(_stage_local, "stack", [])
+    with _stage_stats_lock:
+        for name in set(stack):
+            stats = STAGE_STATS.setdefault(name, _new_stage_stats())
+            stats["bytes_read"] += read
+            stats["bytes_written"] += written
+
+
+def merge_stage_stats(stats):
+    """Fold stage stats gathered in a worker process into this one"""
+    with _stage_stats_lock:
+        for name, s in stats.items():
+            merged = STAGE_STATS.setdefault(name, _new_stage_stats())
+            for key in ("calls", "wall_s", "cpu_s", "bytes_read", "bytes_written"):
+                merged[key] += s[key]
+            if s["process_peak_rss_mb"] is not None:
+                merged["process_peak_rss_mb"] = max(merged["process_peak_rss_mb"] or 0.0,
+                                                    s["process_peak_rss_mb"])
+
+
+def write_profile_report(path, timings):
+    report = {
+        "yaml_backend": YAML_BACKEND,
+        "targets": {target: round(seconds, 3) for target, seconds in timings.items()},
+        "stages": {name: {key: round(value, 3) if isinstance(value, float) else value
+                          for key, value in stats.items()}
+                   for name, stats in sorted(STAGE_STATS.items())},
+        "yaml": YAML_STATS,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Exported: {path}")
 
 # ─── Utilities ─────────────────────────────────────────────
 
 
 def extract_all_refined_type_ids_and_items(type_materials, types):
-    """Build set of all materialTypeIDs used in reprocessing and collect their info"""
-    refined_type_ids = set()
+    """Build set of all materialTypeIDs used in reprocessing and collect their info (types: TypeRecords)"""
+    refined_type_ids = {material["materialTypeID"]
+                        for entry in type_materials.values()
+                        for material in entry.get("materials", [])}
     refined_items = []
 
-    for entry in type_materials.values():
-        for material in entry.get("materials", []):
-            mtid = material["materialTypeID"]
-            refined_type_ids.add(mtid)
-
     for tid in sorted(refined_type_ids):
-        tdata = types.get(tid)
-        if not tdata:
+        record = types.get(tid)
+        if not record:
             continue
         refined_items.append({
             "typeID": tid,
-            "name": tdata.get("name", {}).get("en", "Unknown"),
-            "volume": tdata.get("volume", 1.0)
+            "name": record.name if record.name is not None else "Unknown",
+            "volume": record.volume if record.volume is not None else 1.0
         })
 
     return refined_type_ids, refined_items
 
 
-def load_yaml(path):
+def file_digest(path):
+    """Content hash of a file, read in chunks"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _yaml_cache_file(path, variant=""):
+    # variant separates projections of the same file (e.g. compact type records)
+    key = hashlib.blake2b(f"{os.path.abspath(path)}\0{variant}".encode("utf-8"),
+                          digest_size=16).hexdigest()
+    return os.path.join(YAML_CACHE_DIR, f"{key}.pkl")
+
+
+def _read_yaml_cache(path, st, variant=""):
+    """Return the cached parse of path, or None if missing or stale.
+
+    Entries hold a small meta record followed by the parsed data, so a
+    size/mtime match is decided without unpickling the payload. When only
+    the mtime moved (e.g. a re-extracted SDE zip) the content hash decides.
+    """
+    cache_file = _yaml_cache_file(path, variant)
+    try:
+        with open(cache_file, "rb") as f:
+            meta = pickle.load(f)
+            if meta["path"] != os.path.abspath(path):
+                return None
+            if meta["size"] == st.st_size and meta["mtime_ns"] == st.st_mtime_ns:
+                data = pickle.load(f)
+            elif meta["size"] == st.st_size and meta["digest"] == file_digest(path):
+                data = pickle.load(f)
+                f.close()
+                _write_yaml_cache(path, st, meta["digest"], data, variant)
+                return data
+            else:
+                return None
+    except (OSError, EOFError, KeyError, TypeError, AttributeError, ImportError,
+            pickle.UnpicklingError):
+        # A stale or foreign entry is re-parsed rather than trusted
+        return None
+    os.utime(cache_file)  # Mark as recently used for eviction
+    return data
+
+
+def _write_yaml_cache(path, st, digest, data, variant=""):
+    cache_file = _yaml_cache_file(path, variant)
+    meta = {
+        "path": os.path.abspath(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "digest": digest,
+    }
+    try:
+        os.makedirs(YAML_CACHE_DIR, exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        print(f"⚠️ Could not write YAML cache for {path}: {e}")
+
+
+def prune_yaml_cache(max_bytes=None):
+    """Drop entries whose source changed or vanished, then evict LRU entries over max_bytes"""
+    if not os.path.isdir(YAML_CACHE_DIR):
+        return
+    max_bytes = YAML_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for name in os.listdir(YAML_CACHE_DIR):
+        cache_file = os.path.join(YAML_CACHE_DIR, name)
+        if not name.endswith(".pkl"):
+            if name.endswith(".tmp"):
+                os.remove(cache_file)
+            continue
+        try:
+            with open(cache_file, "rb") as f:
+                meta = pickle.load(f)
+            st = os.stat(meta["path"])
+            stale = meta["size"] != st.st_size
+        except (OSError, EOFError, KeyError, TypeError, pickle.UnpicklingError):
+            stale = True
+        if stale:
+            os.remove(cache_file)
+            continue
+        cst = os.stat(cache_file)
+        entries.append((cst.st_mtime, cst.st_size, cache_file))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, cache_file in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(cache_file)
+        total -= size
+
+
+def clear_yaml_cache():
+    if not os.path.isdir(YAML_CACHE_DIR):
+        return
+    removed = 0
+    for name in os.listdir(YAML_CACHE_DIR):
+        os.remove(os.path.join(YAML_CACHE_DIR, name))
+        removed += 1
+    print(f"🧹 Cleared {removed} YAML cache entries")
+
+
+def _record_yaml_load(path, backend, size, seconds):
+    with _yaml_stats_lock:
+        stats = YAML_STATS.setdefault(
+            backend, {"files": 0, "bytes": 0, "seconds": 0.0})
+        stats["files"] += 1
+        stats["bytes"] += size
+        stats["seconds"] += seconds
+    if size >= YAML_REPORT_MIN_BYTES:
+        mb = size / 1024 ** 2
+        print(f"📖 {os.path.basename(path)}: {mb:.1f} MB in {seconds:.2f}s "
+              f"({mb / max(seconds, 1e-9):.1f} MB/s, {backend})")
+
+
+def report_yaml_stats():
+    """Print per-backend YAML totals, so a missing libyaml shows up in the logs"""
+    for backend, stats in sorted(YAML_STATS.items()):
+        mb = stats["bytes"] / 1024 ** 2
+        print(f"📊 YAML [{backend}]: {stats['files']} files, {mb:.1f} MB in "
+              f"{stats['seconds']:.2f}s ({mb / max(stats['seconds'], 1e-9):.1f} MB/s)")
+
+
+@instrumented("load_yaml")
+def load_yaml(path, project=None, variant="", stream=None):
+    """Parse path (or fetch it from the cache).
+
+    With project, the parsed document is passed through project() and only
+    the result is returned and cached, under variant; bump variant whenever
+    the projection changes. With stream, stream(path) replaces both the
+    parse and project() and must return the projected result itself, so
+    the full document is never built.
+    """
     if not os.path.exists(path):
         print(f"⚠️ Missing: {path}")
-        return {}
+        return project({}) if project else {}
+    st = os.stat(path)
+    started = time.perf_counter()
+    if YAML_CACHE_ENABLED:
+        data = _read_yaml_cache(path, st, variant)
+        if data is not None:
+            _record_yaml_load(path, "cache", st.st_size,
+                              time.perf_counter() - started)
+            record_io(read=os.path.getsize(_yaml_cache_file(path, variant)))
+            return data
+    if stream:
+        data = stream(path)
+        record_io(read=st.st_size)
+        _record_yaml_load(path, f"{YAML_BACKEND}-stream", st.st_size,
+                          time.perf_counter() - started)
+        if YAML_CACHE_ENABLED:
+            _write_yaml_cache(path, st, file_digest(path), data, variant)
+        return data
+    with open(path, "rb") as f:
+        raw = f.read()
+    record_io(read=len(raw))
+    data = yaml.load(raw.decode("utf-8"), Loader=YAMLLoader) or {}
+    _record_yaml_load(path, YAML_BACKEND, st.st_size,
+                      time.perf_counter() - started)
+    if project:
+        data = project(data)
+    if YAML_CACHE_ENABLED:
+        digest = hashlib.blake2b(raw, digest_size=20).hexdigest()
+        _write_yaml_cache(path, st, digest, data, variant)
+    return data
+
+
+def iter_yaml_chunks(path, batch_entries=None):
+    """Split a block-style top-level mapping into text chunks of whole entries.
+
+    Each chunk holds up to batch_entries top-level keys and their bodies and
+    parses on its own, so memory is bounded by one batch, not the file.
+    Once an entry defines an anchor, the rest of the file stays in that
+    entry's chunk, since later entries may alias it. Returns None when the
+    file does not look like a block mapping (flow style, a document-level
+    anchor or tag...), so callers can fall back to a full parse.
+    """
+    batch_entries = batch_entries or STREAM_BATCH_ENTRIES
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+        for line in f:
+            if line.strip() and not line.startswith(("#", "%", "---")):
+                break
+        else:
+            return None
+        if line[:1] in (" ", "\t", "{", "[", "-", "&", "*", "!"):
+            return None
+    return _iter_yaml_chunks(path, batch_entries)
+
+
+# An anchor property where a node starts: line start, after "key:" or "- "
+_YAML_ANCHOR = re.compile(r"(?:^[ \t]*|:[ \t]+|-[ \t]+)&[^\s]")
+
+
+def _iter_yaml_chunks(path, batch_entries):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = []
+        entries = 0
+        anchored = False
+        for line in f:
+            if not anchored and "&" in line and _YAML_ANCHOR.search(line):
+                anchored = True
+            # Unindented, non-comment lines open a new top-level entry
+            if line[:1] not in (" ", "\t", "#", "\n", "\r", "") and not line.startswith(("---", "%")):
+                if entries == batch_entries and not anchored:
+                    yield "".join(lines)
+                    lines = []
+                    entries = 0
+                entries += 1
+            if entries:
+                lines.append(line)
+        if lines:
+            yield "".join(lines)
+
+
+def iter_yaml_entries(path, batch_entries=None):
+    """Yield (key, value) for each top-level entry, parsing one batch at a time"""
+    chunks = iter_yaml_chunks(path, batch_entries)
+    if chunks is None:
+        yield from load_yaml(path).items()
+        return
+    for chunk in chunks:
+        yield from (yaml.load(chunk, Loader=YAMLLoader) or {}).items()
+
+
+@instrumented("scan_yaml_keys")
+def scan_yaml_keys(path, keys):
+    """Read top-level keys from a block-style mapping without parsing the whole document.
+
+    Scalar values are read from their own line; a key with nothing after
+    the colon takes the indented block below it (e.g. a system's stargates),
+    and only that block is parsed. Stops as soon as every key has been
+    seen; keys that never appear are left out of the result.
+    """
+    wanted = {k.encode("utf-8"): k for k in keys}
+    found = {}
+    if not os.path.exists(path):
+        return found
+    block_key, block = None, []
+    with open(path, "rb") as f:
+        for line in f:
+            # Only unindented "key: value" lines are top-level entries
+            indented = line[:1] in (b" ", b"\t", b"-", b"#", b"\r", b"\n")
+            if block_key is not None:
+                if indented:
+                    block.append(line)
+                    continue
+                found[block_key] = yaml.load(b"".join(block).decode("utf-8"), Loader=YAMLLoader)
+                block_key = None
+                if len(found) == len(wanted):
+                    break
+            if indented:
+                continue
+            key, sep, value = line.partition(b":")
+            if not sep or key not in wanted:
+                continue
+            if not value.strip():
+                block_key, block = wanted[key], []
+                continue
+            found[wanted[key]] = yaml.load(
+                value.decode("utf-8"), Loader=YAMLLoader)
+            if len(found) == len(wanted):
+                break
+        if block_key is not None:
+            found[block_key] = yaml.load(b"".join(block).decode("utf-8"), Loader=YAMLLoader)
+        record_io(read=f.tell())
+    return found
 
 
 def load_yaml_parallel(paths):
@@ -77,14 +509,281 @@ def load_yaml_parallel(paths):
     return results
 
 
+TYPE_RECORDS_VARIANT = "type_records:2"
+
+
+def compact_types(types):
+    """Project types.yaml (a dict or (typeID, data) pairs) down to {typeID: TypeRecord}"""
+    items = types.items() if isinstance(types, dict) else types
+    return {int(tid): TypeRecord.from_yaml(tid, tdata) for tid, tdata in items}
+
+
+def _compact_type_chunk(chunk):
+    """Process-pool entry point: parse one chunk of types.yaml into TypeRecords"""
+    return list(compact_types(yaml.load(chunk, Loader=YAMLLoader) or {}).values())
+
+
+def stream_type_records(path, workers=1):
+    """Build {typeID: TypeRecord} from types.yaml one batch of entries at a time.
+
+    With workers > 1, batches are parsed in worker processes; only a few
+    batches per worker are in flight, so memory stays bounded.
+    """
+    chunks = iter_yaml_chunks(path) if workers > 1 else None
+    if chunks is None:
+        return compact_types(iter_yaml_entries(path))
+
+    records = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(_compact_type_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                for record in in_flight.popleft().result():
+                    records[record.type_id] = record
+        while in_flight:
+            for record in in_flight.popleft().result():
+                records[record.type_id] = record
+    return records
+
+
+class SDE:
+    """Session-level SDE view: each fsd file is parsed once, on first access, with int keys"""
+
+    def __init__(self, stream_workers=1):
+        self.stream_workers = stream_workers
+        self._data = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _once(self, key, build):
+        if key not in self._data:
+            # Per-key lock: concurrent extractors wait for one build instead of repeating it
+            with self._locks_guard:
+                lock = self._locks.setdefault(key, threading.Lock())
+            with lock:
+                if key not in self._data:
+                    self._data[key] = build()
+        return self._data[key]
+
+    def _load(self, path, project=None, variant="", stream=None):
+        def build():
+            if project:
+                return load_yaml(path, project, variant, stream)
+            raw = load_yaml(path)
+            return {int(k): v for k, v in raw.items()}
+        return self._once((path, variant), build)
+
+    @property
+    def universe(self):
+        """UniverseIndex of sde/universe; only regions whose files changed are re-read"""
+        return self._once((UNIVERSE_ROOT, "universe_index"),
+                          lambda: load_universe_index(self.stream_workers))
+
+    @property
+    def types(self):
+        """Full types.yaml documents; prefer type_records unless other fields are needed"""
+        return self._load(TYPES_PATH)
+
+    @property
+    def type_records(self):
+        """Compact {typeID: TypeRecord}; types.yaml is streamed, so the full document is never built"""
+        stream = None
+        if STREAM_TYPES:
+            def stream(path):
+                return stream_type_records(path, self.stream_workers)
+        return self._load(TYPES_PATH, compact_types, TYPE_RECORDS_VARIANT, stream)
+
+    @property
+    def groups(self):
+        return self._load(GROUPS_PATH)
+
+    @property
+    def type_materials(self):
+        return self._load(TYPE_MATERIALS_PATH)
+
+    @property
+    def market_groups(self):
+        return self._load(MARKET_GROUPS_PATH)
+
+    @property
+    def icon_ids(self):
+        return self._load(ICON_IDS_PATH)
+
+
+def _open_json_output(path):
+    """Open a text stream for path, compressed according to JSON_COMPRESSION"""
+    if JSON_COMPRESSION == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8")
+    if JSON_COMPRESSION == "zstd":
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+@contextmanager
+def _json_output(path):
+    """_open_json_output under a temporary name, renamed to path once written"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with _open_json_output(tmp) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _json_dumps(value):
+    if JSON_COMPACT:
+        return json.dumps(value, separators=(",", ":"))
+    return json.dumps(value, indent=2)
+
+
+@instrumented("write_json")
+def write_json_stream(filename, items):
+    """Write a top-level JSON object from (key, value) pairs as they are produced.
+
+    Only one top-level value is serialized at a time, and the bytes match
+    json.dump(dict(items), indent=2) (or the compact form). The file is
+    written under a temporary name and renamed when complete.
+    """
+    path = filename + JSON_EXTENSIONS[JSON_COMPRESSION]
+    with _json_output(path) as f:
+        first = True
+        for key, value in items:
+            encoded = _json_dumps(value)
+            if JSON_COMPACT:
+                f.write(("{" if first else ",") +
+                        json.dumps(str(key)) + ":" + encoded)
+            else:
+                # Re-indent the value one level to nest it under the root object
+                f.write(("{\n  " if first else ",\n  ") + json.dumps(str(key)) +
+                        ": " + encoded.replace("\n", "\n  "))
+            first = False
+        if first:
+            f.write("{}")
+        else:
+            f.write("}" if JSON_COMPACT else "\n}")
+    record_io(written=os.path.getsize(path))
+    print(f"💾 Exported: {path}")
+
+
 def write_json(filename, data):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-    print(f"💾 Exported: {filename}")
+    if isinstance(data, dict):
+        write_json_stream(filename, data.items())
+        return
+    path = filename + JSON_EXTENSIONS[JSON_COMPRESSION]
+    with stage("write_json"):
+        with _json_output(path) as f:
+            f.write(_json_dumps(data))
+        record_io(written=os.path.getsize(path))
+    print(f"💾 Exported: {path}")
+
+# ─── Incremental Builds ────────────────────────────────────
+BUILD_MANIFEST_PATH = "build_manifest.json"
+FORCE_REBUILD = False  # --force rebuilds everything regardless of the manifest
+
+MARKET_INPUTS = [TYPES_PATH, MARKET_GROUPS_PATH, ICON_IDS_PATH]
+MARKET_OUTPUTS = ["market.json"]
+RESOURCE_INPUTS = [TYPES_PATH, TYPE_MATERIALS_PATH,
+                   GROUPS_PATH, ORE_VARIANTS_PATH]
+RESOURCE_OUTPUTS = ["ores.json", "ice.json", "moon_ore.json",
+                    "gas_clouds.json", "refined_outputs.json"]
+if sdeReprocessing is not None:
+    RESOURCE_OUTPUTS.append("refine_matrix.npz")
+
+
+def read_json(filename):
+    """Load a previously written output, honouring the current compression setting"""
+    path = filename + JSON_EXTENSIONS[JSON_COMPRESSION]
+    if JSON_COMPRESSION == "gzip":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    if JSON_COMPRESSION == "zstd":
+        with open(path, "rb") as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw)
+            return json.load(io.TextIOWrapper(reader, encoding="utf-8"))
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_build_manifest():
+    if not os.path.exists(BUILD_MANIFEST_PATH):
+        return {"files": {}}
+    try:
+        with open(BUILD_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable {BUILD_MANIFEST_PATH}: {e}")
+        return {"files": {}}
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_build_manifest(manifest):
+    # Forget digests of files that no longer exist
+    manifest["files"] = {path: entry for path, entry in manifest["files"].items()
+                         if os.path.exists(path)}
+    tmp = f"{BUILD_MANIFEST_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, BUILD_MANIFEST_PATH)
+
+
+def cached_file_digest(manifest, path):
+    """Content hash of path; only re-hashed when its size or mtime changed"""
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    entry = manifest["files"].get(path)
+    if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+        return entry[2]
+    digest = file_digest(path)
+    manifest["files"][path] = [st.st_size, st.st_mtime_ns, digest]
+    return digest
+
+
+def _build_settings():
+    # Anything besides the SDE inputs that changes output bytes
+    return {
+        "extractor": file_digest(os.path.abspath(__file__)),
+        "compact": JSON_COMPACT,
+        "compression": JSON_COMPRESSION,
+        "market_flat": MARKET_FLAT,
+        "icon_atlas": ICON_ATLAS,
+        "market_shard_depth": MARKET_SHARD_DEPTH,
+    }
+
+
+def _outputs_exist(outputs):
+    return all(os.path.exists(name + JSON_EXTENSIONS[JSON_COMPRESSION] if name.endswith(".json") else name)
+               for name in outputs)
+
+
+def build_if_changed(manifest, target, inputs, outputs, build, check=None):
+    """Run build() unless the target's input hashes match the manifest and its outputs exist.
+
+    check, if given, is one more condition for skipping (e.g. that files
+    an output refers to are all there).
+    """
+    state = {
+        "inputs": {path: cached_file_digest(manifest, path) for path in inputs},
+        "settings": _build_settings(),
+    }
+    if (not FORCE_REBUILD and manifest.get(target) == state and _outputs_exist(outputs)
+            and (check is None or check())):
+        print(f"\n⏭️ {', '.join(outputs)} up to date, skipping {target}")
+        return False
+    build()
+    manifest[target] = state
+    return True
 
 # ─── Station Extraction ────────────────────────────────────
 
 
+@instrumented("extract_stations")
 def extract_stations():
     raw = load_yaml(STATIONS_PATH)
     stations = {}
@@ -97,10 +796,269 @@ def extract_stations():
 # This function is no longer needed since we're not filtering by NPC corps
 # All stations in staStations.yaml are NPC stations
 
+# ─── Universe Index ───────────────────────────────────────
+
+# Worker processes for indexing changed regions; 1 keeps everything in this process
+LOCATION_WORKERS = os.cpu_count() or 1
+UNIVERSE_INDEX_PATH = os.path.join(YAML_CACHE_DIR, "universe_index.json")
+UNIVERSE_INDEX_VERSION = 2
+
+
+class UniverseIndex:
+    """Region, constellation and system IDs -> directory names, parents and key fields.
+
+    regions holds one entry per region directory in listing order, each
+    with its constellations and their systems in listing order, so
+    consumers iterate the universe exactly as a directory walk would.
+    """
+
+    def __init__(self, regions):
+        self.regions = regions
+        self._regions = {}
+        self.constellations = {}
+        self.systems = {}
+        for region in regions:
+            region_id = region["regionID"]
+            self._regions[region_id] = region
+            for const in region["constellations"]:
+                const_id = const["constellationID"]
+                self.constellations[const_id] = {
+                    "name": const["name"], "constellationID": const_id, "regionID": region_id}
+                for system in const["systems"]:
+                    self.systems[system["solarSystemID"]] = dict(
+                        system, constellationID=const_id, regionID=region_id)
+
+    def region(self, region_id):
+        return self._regions.get(region_id)
+
+    def constellation(self, constellation_id):
+        return self.constellations.get(constellation_id)
+
+    def system(self, system_id):
+        return self.systems.get(system_id)
+
+
+def _region_stat_fingerprint(dirpath):
+    """Sizes and mtimes of every file under a region; no YAML is read"""
+    h = hashlib.blake2b(digest_size=20)
+    for root, dirnames, filenames in os.walk(dirpath):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            h.update(f"{os.path.relpath(path, dirpath)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+@instrumented("index_region")
+def _index_region(dirpath):
+    """Index one region directory: IDs from the YAML headers, names from the directories"""
+    region = {
+        "name": os.path.basename(dirpath),
+        "dir": dirpath,
+        "regionID": scan_yaml_keys(os.path.join(dirpath, "region.yaml"), ("regionID",)).get("regionID"),
+        "constellations": [],
+    }
+
+    for const_folder in os.listdir(dirpath):
+        constellation_path = os.path.join(dirpath, const_folder)
+        cyaml = os.path.join(constellation_path, "constellation.yaml")
+        if not os.path.isdir(constellation_path) or not os.path.exists(cyaml):
+            continue
+
+        const = {
+            "name": const_folder,
+            "constellationID": scan_yaml_keys(cyaml, ("constellationID",)).get("constellationID"),
+            "systems": [],
+        }
+        for sys_folder in os.listdir(constellation_path):
+            system_path = os.path.join(constellation_path, sys_folder)
+            syaml = os.path.join(system_path, "solarsystem.yaml")
+            if not os.path.isdir(system_path) or not os.path.exists(syaml):
+                continue
+
+            # solarsystem.yaml carries every planet, moon and belt; only the
+            # header scalars are needed, so it is scanned rather than parsed
+            sdata = scan_yaml_keys(syaml, ("solarSystemID", "solarSystemNameID", "security", "stargates"))
+            const["systems"].append({
+                "name": sys_folder,
+                "solarSystemID": sdata.get("solarSystemID"),
+                "solarSystemNameID": sdata.get("solarSystemNameID"),
+                "security": sdata.get("security"),
+                # [gateID, destination gateID] pairs
+                "stargates": [[gate_id, gate.get("destination")]
+                              for gate_id, gate in (sdata.get("stargates") or {}).items()],
+            })
+        region["constellations"].append(const)
+
+    return region
+
+
+def _index_region_task(dirpath):
+    """Process-pool entry point: also hands back this task's YAML and stage stats"""
+    YAML_STATS.clear()
+    STAGE_STATS.clear()
+    region = _index_region(dirpath)
+    return region, dict(YAML_STATS), dict(STAGE_STATS)
+
+
+def _merge_worker_stats(result):
+    region, stats, stage_stats = result
+    merge_stage_stats(stage_stats)
+    # Worker reads count towards the stage waiting on them here (index_universe)
+    record_io(read=stage_stats.get("index_region", {}).get("bytes_read", 0))
+    with _yaml_stats_lock:
+        for backend, s in stats.items():
+            merged = YAML_STATS.setdefault(
+                backend, {"files": 0, "bytes": 0, "seconds": 0.0})
+            for key in merged:
+                merged[key] += s[key]
+    return region
+
+
+def _read_universe_index():
+    try:
+        with open(UNIVERSE_INDEX_PATH, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != UNIVERSE_INDEX_VERSION or index.get("root") != os.path.abspath(UNIVERSE_ROOT):
+        return {}
+    return {region["dir"]: region for region in index.get("regions", [])}
+
+
+def _write_universe_index(regions):
+    try:
+        os.makedirs(YAML_CACHE_DIR, exist_ok=True)
+        tmp = f"{UNIVERSE_INDEX_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": UNIVERSE_INDEX_VERSION, "root": os.path.abspath(UNIVERSE_ROOT),
+                       "regions": regions}, f, separators=(",", ":"))
+        os.replace(tmp, UNIVERSE_INDEX_PATH)
+    except OSError as e:
+        print(f"⚠️ Could not write universe index: {e}")
+
+
+@instrumented("index_universe")
+def load_universe_index(workers=None):
+    """Build or refresh the UniverseIndex for UNIVERSE_ROOT.
+
+    The index is kept in the YAML cache directory; a region is re-indexed
+    only when the size or mtime of one of its files changed, so an
+    unchanged SDE costs a directory walk and a stat per file.
+    """
+    previous = _read_universe_index() if YAML_CACHE_ENABLED else {}
+
+    # Regions in walk order (including the hidden PLEX region)
+    region_dirs = []
+    for dirpath, dirnames, filenames in os.walk(UNIVERSE_ROOT):
+        if "region.yaml" in filenames:
+            region_dirs.append(dirpath)
+            dirnames[:] = []  # Regions never nest, so skip walking their subtrees
+
+    regions = [None] * len(region_dirs)
+    pending = []
+    for i, dirpath in enumerate(region_dirs):
+        fingerprint = _region_stat_fingerprint(dirpath)
+        if previous.get(dirpath, {}).get("fingerprint") == fingerprint:
+            regions[i] = previous[dirpath]
+        else:
+            pending.append((i, fingerprint))
+
+    if pending:
+        print(f"🗺️  Indexing {len(pending)} of {len(region_dirs)} universe regions...")
+        workers = LOCATION_WORKERS if workers is None else workers
+        workers = max(1, min(workers, len(pending)))
+        paths = [region_dirs[i] for i, _ in pending]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as executor:
+                indexed = [_merge_worker_stats(result)
+                           for result in executor.map(_index_region_task, paths)]
+        else:
+            indexed = [_index_region(path) for path in paths]
+        for (i, fingerprint), region in zip(pending, indexed):
+            region["fingerprint"] = fingerprint
+            regions[i] = region
+
+    if YAML_CACHE_ENABLED and (pending or len(previous) != len(regions)):
+        _write_universe_index(regions)
+    return UniverseIndex(regions)
+
 # ─── Simplified Location Extraction ─────────────────────────
 
 
-def extract_locations():
+@instrumented("extract_region")
+def _extract_region(region, region_entry, is_plex_region):
+    """Build one region's locations object from its universe index entry.
+
+    region_entry is this region's slice of the station-derived structure
+    (None when it has no stations). Returns (region_obj, station_count).
+    """
+    region_obj = {"regionID": region["regionID"]}
+    station_count = 0
+
+    for const in region["constellations"]:
+        constellation_id = const["constellationID"]
+
+        # Check if this constellation has stations
+        has_stations = (region_entry is not None and
+                        constellation_id in region_entry["constellations"])
+
+        # For PLEX region, include all constellations even without stations
+        if not has_stations and not is_plex_region:
+            continue
+
+        constellation_obj = {"constellationID": constellation_id}
+
+        for system in const["systems"]:
+            system_id = system["solarSystemID"]
+
+            # Check if this system has stations or is in PLEX region
+            has_system_stations = (has_stations and
+                                   system_id in region_entry["constellations"][constellation_id]["systems"])
+
+            # For PLEX region, include all systems even without stations
+            if not has_system_stations and not is_plex_region:
+                continue
+
+            system_obj = {
+                "solarSystemID": system_id,
+                "solarSystemNameID": system["solarSystemNameID"],
+                "security": system["security"],
+                "stations": {}
+            }
+
+            # Add stations if this system has them (PLEX region won't have stations)
+            if has_system_stations:
+                system_stations = region_entry["constellations"][
+                    constellation_id]["systems"][system_id]["stations"]
+                system_obj["stations"] = system_stations
+                station_count += len(system_stations)
+
+            # Use system directory name as key
+            constellation_obj[system["name"]] = system_obj
+
+        # Only add constellation if it has systems, use constellation directory name as key
+        # For PLEX region, include all constellations even without stations
+        if len(constellation_obj) > 1:  # More than just constellationID
+            region_obj[const["name"]] = constellation_obj
+
+    return region_obj, station_count
+
+
+def _locations_digest(tasks):
+    """Hash of everything locations.json is built from: index entries and station slices"""
+    h = hashlib.blake2b(digest_size=20)
+    for region, region_entry, is_plex_region in tasks:
+        h.update(json.dumps([{k: v for k, v in region.items() if k != "fingerprint"},
+                             region_entry, is_plex_region],
+                            sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+@instrumented("extract_locations")
+def extract_locations(sde=None, manifest=None):
+    sde = sde or SDE(stream_workers=LOCATION_WORKERS)
     stations = extract_stations()
 
     print("\n🧭 Extracting universe locations (using directory names)...")
@@ -149,16 +1107,10 @@ def extract_locations():
         f"🔍 Looking up directory names for {len(regions_to_lookup)} regions with stations...")
     print("🔍 Also scanning for PLEX region in hidden directory...")
 
-    locations = {}
-
-    # Process each region directory in the universe (including hidden PLEX region)
-    for dirpath, _, filenames in os.walk(UNIVERSE_ROOT):
-        if "region.yaml" not in filenames:
-            continue
-
-        ryaml = os.path.join(dirpath, "region.yaml")
-        rdata = load_yaml(ryaml)
-        region_id = rdata.get("regionID")
+    # Regions in universe index order (including hidden PLEX region)
+    tasks = []
+    for region in sde.universe.regions:
+        region_id = region["regionID"]
 
         # Check if this is a region we need (has stations) OR if it's the PLEX region
         is_plex_region = (region_id == PLEX_REGION_ID)
@@ -167,128 +1119,120 @@ def extract_locations():
         if not has_stations and not is_plex_region:
             continue
 
-        # Extract region name from directory path
-        # Path structure: .../universe/eve/REGION_NAME/... or .../universe/hidden/REGION_NAME/...
-        path_parts = dirpath.split(os.sep)
-        region_name = path_parts[-1]  # Last part is the region directory name
-
-        print(
-            f"⚙️  Processing: {region_name} (ID: {region_id})...", end=" ", flush=True)
-
-        # Start building the region object
-        region_obj = {"regionID": region_id}
-
-        # Get constellation folders
-        constellation_folders = [d for d in os.listdir(dirpath)
-                                 if os.path.isdir(os.path.join(dirpath, d))]
-
-        station_count = 0
-
-        for const_folder in constellation_folders:
-            constellation_path = os.path.join(dirpath, const_folder)
-            cyaml = os.path.join(constellation_path, "constellation.yaml")
-
-            if not os.path.exists(cyaml):
-                continue
-
-            cdata = load_yaml(cyaml)
-            constellation_id = cdata.get("constellationID")
-            constellation_name = const_folder  # Use directory name
-
-            # Check if this constellation has stations
-            has_stations = (region_id in region_structure and
-                            constellation_id in region_structure[region_id]["constellations"])
-
-            # For PLEX region, include all constellations even without stations
-            if not has_stations and not is_plex_region:
-                continue
-
-            constellation_obj = {"constellationID": constellation_id}
-
-            # Process system folders in this constellation
-            system_folders = [d for d in os.listdir(constellation_path)
-                              if os.path.isdir(os.path.join(constellation_path, d))]
-
-            for sys_folder in system_folders:
-                system_path = os.path.join(constellation_path, sys_folder)
-                syaml = os.path.join(system_path, "solarsystem.yaml")
-
-                if not os.path.exists(syaml):
-                    continue
-
-                sdata = load_yaml(syaml)
-                system_id = sdata.get("solarSystemID")
-                system_name = sys_folder  # Use directory name
+        tasks.append((region, region_structure.get(region_id), is_plex_region))
+
+    # With a manifest, an unchanged index and station set skips the rewrite
+    digest = None
+    if manifest is not None:
+        digest = _locations_digest(tasks)
+        state = {"settings": _build_settings(), "digest": digest}
+        if (not FORCE_REBUILD and manifest.get("locations") == state
+                and _outputs_exist(["locations.json"])):
+            print("⏭️ locations.json is up to date")
+            return
+
+    def region_entries():
+        # Regions are yielded as they are built, so the writer never holds them all
+        for region, region_entry, is_plex_region in tasks:
+            print(
+                f"⚙️  Processing: {region['name']} (ID: {region['regionID']})...", end=" ", flush=True)
+
+            region_obj, station_count = _extract_region(region, region_entry, is_plex_region)
+
+            # Add region if it has content or is PLEX region, use region directory name as key
+            if len(region_obj) > 1 or is_plex_region:
+                if is_plex_region:
+                    print("✅ (PLEX region - no stations)")
+                else:
+                    print(f"✅ ({station_count} stations)")
+                yield region["name"], region_obj
+            else:
+                print("⏭️ (no content)")
 
-                # Check if this system has stations or is in PLEX region
-                has_system_stations = (has_stations and
-                                       system_id in region_structure[region_id]["constellations"][constellation_id]["systems"])
+    print(f"\n💾 Writing locations.json...")
+    write_json_stream("locations.json", region_entries())
+
+    if manifest is not None:
+        manifest["locations"] = {"settings": _build_settings(), "digest": digest}
+
+# ─── Stargate Jump Graph ───────────────────────────────────
+
+
+def build_jump_graph(universe):
+    """CSR adjacency of the stargate network over every indexed system.
+
+    systemIDs is sorted; the neighbours of systemIDs[i] are systemIDs[j]
+    for j in indices[indptr[i]:indptr[i + 1]]. names and security are
+    aligned with systemIDs.
+    """
+    gate_owner = {}
+    for system_id, system in universe.systems.items():
+        for gate_id, _ in system["stargates"]:
+            gate_owner[gate_id] = system_id
+
+    system_ids = sorted(sid for sid in universe.systems if sid is not None)
+    position = {sid: i for i, sid in enumerate(system_ids)}
+    indptr, indices = [0], []
+    for system_id in system_ids:
+        # Gates whose destination is outside the index (partial SDEs) are dropped
+        neighbors = {position[gate_owner[destination]]
+                     for _, destination in universe.systems[system_id]["stargates"]
+                     if destination in gate_owner}
+        indices.extend(sorted(neighbors))
+        indptr.append(len(indices))
+
+    return {
+        "systemIDs": system_ids,
+        "names": [universe.systems[sid]["name"] for sid in system_ids],
+        "security": [universe.systems[sid]["security"] for sid in system_ids],
+        "indptr": indptr,
+        "indices": indices,
+    }
 
-                # For PLEX region, include all systems even without stations
-                if not has_system_stations and not is_plex_region:
-                    continue
 
-                system_obj = {
-                    "solarSystemID": system_id,
-                    "solarSystemNameID": sdata.get("solarSystemNameID"),
-                    "security": sdata.get("security"),
-                    "stations": {}
-                }
+@instrumented("extract_jump_graph")
+def extract_jump_graph(sde=None, manifest=None):
+    sde = sde or SDE(stream_workers=LOCATION_WORKERS)
+    print("\n🌌 Building jump_graph.json from stargates...")
+    graph = build_jump_graph(sde.universe)
 
-                # Add stations if this system has them (PLEX region won't have stations)
-                if has_system_stations:
-                    system_stations = region_structure[region_id]["constellations"][
-                        constellation_id]["systems"][system_id]["stations"]
-                    system_obj["stations"] = system_stations
-                    station_count += len(system_stations)
-
-                # Use system directory name as key
-                constellation_obj[system_name] = system_obj
-
-            # Only add constellation if it has systems, use constellation directory name as key
-            # For PLEX region, include all constellations even without stations
-            if len(constellation_obj) > 1:  # More than just constellationID
-                region_obj[constellation_name] = constellation_obj
-
-        # Add region if it has content or is PLEX region, use region directory name as key
-        if len(region_obj) > 1 or is_plex_region:
-            locations[region_name] = region_obj
-            if is_plex_region:
-                print("✅ (PLEX region - no stations)")
-            else:
-                print(f"✅ ({station_count} stations)")
-        else:
-            print("⏭️ (no content)")
+    state = None
+    if manifest is not None:
+        digest = hashlib.blake2b(json.dumps(graph).encode("utf-8"), digest_size=20).hexdigest()
+        state = {"settings": _build_settings(), "digest": digest}
+        if (not FORCE_REBUILD and manifest.get("jump_graph") == state
+                and _outputs_exist(["jump_graph.json"])):
+            print("⏭️ jump_graph.json is up to date")
+            return
 
-    print(f"\n💾 Writing locations.json...")
-    write_json("locations.json", locations)
+    print(f"🔗 {len(graph['systemIDs'])} systems, {len(graph['indices'])} one-way stargate jumps")
+    write_json("jump_graph.json", graph)
+    if manifest is not None:
+        manifest["jump_graph"] = state
 
 # ─── PLEX Market Lookup ───────────────────────────────────
 
 
-def get_plex_location():
+def get_plex_location(sde=None):
     try:
-        with open("locations.json", "r", encoding="utf-8") as f:
-            locations = json.load(f)
-
-        for region_name, region_data in locations.items():
-            if region_data.get("regionID") == PLEX_REGION_ID:
-                for constellation_name, const_data in region_data.items():
-                    if not isinstance(const_data, dict) or "constellationID" not in const_data:
-                        continue
-                    for system_name, sys_data in const_data.items():
-                        if not isinstance(sys_data, dict) or "solarSystemID" not in sys_data:
-                            continue
-                        # Return the first system in the PLEX region as the PLEX location
-                        return {
-                            "region": region_name,
-                            "regionID": region_data.get("regionID"),
-                            "constellation": constellation_name,
-                            "constellationID": const_data.get("constellationID"),
-                            "system": system_name,
-                            "systemID": sys_data.get("solarSystemID"),
-                            "security": sys_data.get("security")
-                        }
+        universe = (sde or SDE()).universe
+        region = universe.region(PLEX_REGION_ID)
+        if region is None:
+            print(f"⚠️ PLEX region {PLEX_REGION_ID} not found in {UNIVERSE_ROOT}")
+            return {}
+
+        for const in region["constellations"]:
+            for system in const["systems"]:
+                # Return the first system in the PLEX region as the PLEX location
+                return {
+                    "region": region["name"],
+                    "regionID": region["regionID"],
+                    "constellation": const["name"],
+                    "constellationID": const["constellationID"],
+                    "system": system["name"],
+                    "systemID": system["solarSystemID"],
+                    "security": system["security"]
+                }
     except Exception as e:
         print(f"⚠️ Failed to find PLEX location: {e}")
     return {}
@@ -296,17 +1240,14 @@ def get_plex_location():
 # ─── Market Structure Extraction ───────────────────────────
 
 
-def extract_market():
+@instrumented("extract_market")
+def extract_market(sde=None):
     print("\n🛒 Building market.json from types.yaml, marketGroups.yaml, iconIDs.yaml...")
 
-    types = load_yaml(TYPES_PATH)
-    market_groups = load_yaml(MARKET_GROUPS_PATH)
-    icon_ids = load_yaml(ICON_IDS_PATH)
-
-    # Normalize keys
-    types = {int(k): v for k, v in types.items()}
-    market_groups = {int(k): v for k, v in market_groups.items()}
-    icon_ids = {int(k): v for k, v in icon_ids.items()}
+    sde = sde or SDE()
+    types = sde.type_records
+    market_groups = sde.market_groups
+    icon_ids = sde.icon_ids
 
     from collections import defaultdict
 
@@ -318,114 +1259,325 @@ def extract_market():
 
     # Step 2: Collect types by marketGroupID
     types_by_mgid = defaultdict(list)
-    for type_id, type_data in types.items():
-        mgid = type_data.get("marketGroupID")
+    for type_id, record in types.items():
+        mgid = record.market_group_id
         if mgid is not None and mgid in market_groups:
             types_by_mgid[mgid].append({
                 "typeID": str(type_id),
-                "typeName": type_data.get("name", {}).get("en", "Unknown"),
-                "iconID": str(type_data.get("iconID", "")),
-                "iconFile": icon_lookup.get(type_data.get("iconID", 0), ""),
-                "volume": type_data.get("volume", 0.0),
-                "mass": type_data.get("mass", 0.0),
-                "published": type_data.get("published", False)
+                "typeName": record.name if record.name is not None else "Unknown",
+                "iconID": str(record.icon_id) if record.icon_id is not None else "",
+                "iconFile": icon_lookup.get(record.icon_id if record.icon_id is not None else 0, ""),
+                "volume": record.volume if record.volume is not None else 0.0,
+                "mass": record.mass if record.mass is not None else 0.0,
+                "published": record.published
             })
 
-    # Step 3: Build parent->children map
+    # Step 3: Precompute every group's name, _info and name-sorted children once
+    names = {mgid: mgdata.get("nameID", {}).get("en", f"Unknown_{mgid}")
+             for mgid, mgdata in market_groups.items()}
     children_map = defaultdict(list)
     for mgid, mgdata in market_groups.items():
         parent_id = mgdata.get("parentGroupID")
         children_map[parent_id].append(mgid)
+    for children in children_map.values():
+        children.sort(key=names.__getitem__)
 
-    # Step 4: Recursively build the market group tree
-    def build_node(mgid):
+    def group_info(mgid):
         mgdata = market_groups[mgid]
-        group_name = mgdata.get("nameID", {}).get("en", f"Unknown_{mgid}")
-        has_types = mgdata.get("hasTypes", False)
         icon_id = mgdata.get("iconID", 0)
-
-        node = {}
-
-        info = {
+        return {
             "marketGroupID": str(mgid),
             "iconID": str(icon_id),
             "iconFile": icon_lookup.get(icon_id, ""),
-            "hasTypes": "True" if has_types else "False"
+            "hasTypes": "True" if mgdata.get("hasTypes", False) else "False"
         }
 
-        if has_types:
-            # Leaf group with types
-            items = sorted(types_by_mgid.get(mgid, []),
-                           key=lambda x: x["typeName"])
-            node["_info"] = info
-            node["items"] = items
-        else:
-            # Parent group: build children recursively
-            children = children_map.get(mgid, [])
-            child_nodes = {}
-            for child_id in sorted(children, key=lambda cid: market_groups[cid].get("nameID", {}).get("en", f"Unknown_{cid}")):
-                child_node = build_node(child_id)
-                child_nodes.update(child_node)
-            node = dict(sorted(child_nodes.items()))
-            node["_info"] = info
+    # Step 4: Build a group's subtree iteratively (post-order), so depth is unbounded.
+    # Children are already in name order, so nodes are filled in final key order;
+    # a repeated sibling name keeps its first position and the last group's content.
+    @instrumented("build_node")
+    def build_node(root_id):
+        built = {}
+        stack = [(root_id, False)]
+        while stack:
+            mgid, expanded = stack.pop()
+            if market_groups[mgid].get("hasTypes", False):
+                # Leaf group with types
+                built[mgid] = {
+                    "_info": group_info(mgid),
+                    "items": sorted(types_by_mgid.get(mgid, []), key=lambda x: x["typeName"])
+                }
+            elif not expanded:
+                stack.append((mgid, True))
+                stack.extend((child_id, False)
+                             for child_id in reversed(children_map.get(mgid, [])))
+            else:
+                # Parent group: children are built by now
+                node = {}
+                for child_id in children_map.get(mgid, []):
+                    node[names[child_id]] = built.pop(child_id)
+                node["_info"] = group_info(mgid)
+                built[mgid] = node
+        return built[root_id]
+
+    # Step 5: Order top-level groups; a repeated name keeps its first
+    # position but the last group's content, as dict.update would
+    roots = {}
+    for root_id in children_map[None]:
+        roots[names[root_id]] = root_id
+
+    # Step 6: Stream JSON, building each top-level branch only when it is written
+    entries = ((name, build_node(root_id)) for name, root_id in roots.items())
+    if MARKET_SHARD_DEPTH:
+        shards = MarketShardWriter(MARKET_SHARD_DEPTH)
+        entries = shards.tee(entries)
+    if ICON_ATLAS:
+        from sdeIcons import ICON_MANIFEST_PATH
+        # Top-level _info is not a group: it points consumers at the icon atlases
+        entries = itertools.chain([("_info", {"iconManifest": ICON_MANIFEST_PATH})], entries)
+    write_json_stream("market.json", entries)
+    if MARKET_SHARD_DEPTH:
+        shards.finish()
+    else:
+        # Shards left by an earlier --shard run would no longer match market.json
+        stale = MARKET_INDEX_PATH + JSON_EXTENSIONS[JSON_COMPRESSION]
+        if os.path.exists(stale):
+            os.remove(stale)
+        shutil.rmtree(MARKET_SHARD_DIR, ignore_errors=True)
+
+    # Optional flat form: one record per group (pre-order), linked by parentGroupID
+    if MARKET_FLAT:
+        flat = []
+        stack = [(root_id, None) for root_id in reversed(list(roots.values()))]
+        while stack:
+            mgid, parent_id = stack.pop()
+            record = dict(group_info(mgid), name=names[mgid],
+                          parentGroupID=str(parent_id) if parent_id is not None else None)
+            if market_groups[mgid].get("hasTypes", False):
+                record["items"] = sorted(types_by_mgid.get(mgid, []), key=lambda x: x["typeName"])
+            else:
+                # Same sibling de-duplication as the tree: last group per name wins
+                by_name = {names[child_id]: child_id for child_id in children_map.get(mgid, [])}
+                stack.extend((child_id, mgid) for child_id in reversed(list(by_name.values())))
+            flat.append(record)
+        write_json("market_flat.json", flat)
+    else:
+        # A flat list left by an earlier --flat run would no longer match market.json
+        stale = "market_flat.json" + JSON_EXTENSIONS[JSON_COMPRESSION]
+        if os.path.exists(stale):
+            os.remove(stale)
+
+# ─── Market Shards ─────────────────────────────────────────
+
 
-        return {group_name: node}
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
 
-    # Step 5: Build top-level market tree
-    market_tree = {}
-    for root_id in sorted(children_map[None], key=lambda rid: market_groups[rid].get("nameID", {}).get("en", f"Unknown_{rid}")):
-        market_tree.update(build_node(root_id))
 
-    # Step 6: Write JSON
-    write_json("market.json", market_tree)
+def _write_market_shard(name, node):
+    """Thread-pool entry point: write one subtree under a content-hashed name.
+
+    Returns its index record. A file that already has the name holds the
+    same bytes, so it is left alone.
+    """
+    data = _json_dumps(node).encode("utf-8")
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    stem = "-".join(filter(None, (node["_info"]["marketGroupID"], _slug(name))))
+    filename = f"{stem}.{digest[:12]}.json{JSON_EXTENSIONS[JSON_COMPRESSION]}"
+    path = os.path.join(MARKET_SHARD_DIR, filename)
+    if not os.path.exists(path):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with _open_json_output(tmp) as f:
+            f.write(data.decode("utf-8"))
+        os.replace(tmp, path)
+    return {"file": f"{MARKET_SHARD_DIR}/{filename}", "bytes": os.path.getsize(path), "hash": digest}
+
+
+def market_shards_exist():
+    """Whether every shard market_index.json lists is on disk"""
+    try:
+        index = read_json(MARKET_INDEX_PATH)
+    except (OSError, ValueError):
+        return False
+    stack = [node for name, node in index.items() if name != "_info"]
+    while stack:
+        node = stack.pop()
+        if "_shard" in node:
+            if not os.path.exists(node["_shard"]["file"]):
+                return False
+        else:
+            stack.extend(child for name, child in node.items() if name != "_info")
+    return True
+
+
+class MarketShardWriter:
+    """Splits market.json into one file per market group at a given depth.
+
+    Depth 1 gives one shard per top-level group; deeper groups keep their
+    ancestors in market_index.json as {child name: ..., "_info": ...} and
+    become shards themselves. A leaf group above the depth is a shard too.
+    Each shard is the group's market.json subtree, named after its content
+    hash, and index entries are {"_info": ..., "_shard": {file, bytes, hash}}.
+    Shards are encoded, compressed and written on a thread pool while
+    market.json streams.
+    """
+
+    def __init__(self, depth, workers=None):
+        self.depth = depth
+        self.index = {}
+        self.pending = []
+        os.makedirs(MARKET_SHARD_DIR, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+
+    def tee(self, entries):
+        """Pass (name, node) pairs through, queueing their shards on the way"""
+        for name, node in entries:
+            self.index[name] = self._index_node(name, node, 1)
+            yield name, node
+
+    def _index_node(self, name, node, depth):
+        if depth >= self.depth or "items" in node:
+            entry = {"_info": node["_info"], "_shard": None}
+            self.pending.append((entry, self.executor.submit(_write_market_shard, name, node)))
+            return entry
+        entry = {child: self._index_node(child, child_node, depth + 1)
+                 for child, child_node in node.items() if child != "_info"}
+        entry["_info"] = node["_info"]
+        return entry
+
+    @instrumented("write_market_shards")
+    def finish(self):
+        """Wait for every shard, drop stale ones and write market_index.json"""
+        try:
+            for entry, future in self.pending:
+                entry["_shard"] = future.result()
+        finally:
+            self.executor.shutdown()
+        live = {os.path.basename(entry["_shard"]["file"]) for entry, _ in self.pending}
+        for filename in os.listdir(MARKET_SHARD_DIR):
+            if filename not in live:
+                os.remove(os.path.join(MARKET_SHARD_DIR, filename))
+        record_io(written=sum(entry["_shard"]["bytes"] for entry, _ in self.pending))
+
+        info = {"shardDepth": self.depth, "shards": len(self.pending),
+                "bytes": sum(entry["_shard"]["bytes"] for entry, _ in self.pending)}
+        if ICON_ATLAS:
+            from sdeIcons import ICON_MANIFEST_PATH
+            info["iconManifest"] = ICON_MANIFEST_PATH
+        # Root _info is listed first, as in market.json with --icon-atlas
+        write_json_stream(MARKET_INDEX_PATH, itertools.chain([("_info", info)], self.index.items()))
+        print(f"🧩 {len(self.pending)} market shards in {MARKET_SHARD_DIR}/")
 
 
 # ─── Ores, Ice & Moon Ore Extraction ──────────────────────
 
 
+class VariantClassifier:
+    """Classifies ore/ice/moon ore names as base, variant or compressed in one regex match.
+
+    Rules come from ore_variants.json: compressed_keywords match anywhere in
+    a name; each item type lists variant prefixes and suffixes (matched
+    case-insensitively, in listed order) and may "extends" another type's
+    lists. Each type compiles to a single pattern.
+    """
+
+    def __init__(self, rules, source="ore_variants.json"):
+        self.source = source
+        self.keywords = [k.lower() for k in rules.get("compressed_keywords", [])]
+        compressed = "|".join(re.escape(k) for k in self.keywords)
+        self._compressed = re.compile(compressed, re.IGNORECASE) if compressed else None
+        self._patterns = {}
+        variants = rules.get("variants", {})
+        for item_type in variants:
+            prefixes, suffixes = self._resolve(variants, item_type, set(), source)
+            self._patterns[item_type] = self._compile(prefixes, suffixes, compressed)
+        self._default = self._compile([], [], compressed)
+
+    @staticmethod
+    def _resolve(variants, item_type, seen, source):
+        if item_type in seen:
+            raise ValueError(f"{source}: 'extends' cycle at {item_type}")
+        seen.add(item_type)
+        spec = variants[item_type]
+        prefixes, suffixes = [], []
+        if "extends" in spec:
+            if spec["extends"] not in variants:
+                raise ValueError(f"{source}: {item_type} extends unknown variants "
+                                 f"{spec['extends']!r}")
+            prefixes, suffixes = VariantClassifier._resolve(
+                variants, spec["extends"], seen, source)
+        return prefixes + spec.get("prefixes", []), suffixes + spec.get("suffixes", [])
+
+    @staticmethod
+    def _compile(prefixes, suffixes, compressed):
+        # The optional lookahead records a compressed keyword anywhere in the name
+        parts = ["^"]
+        if compressed:
+            parts.append(f"(?:(?=.*?(?P<compressed>{compressed})))?")
+        if prefixes:
+            parts.append(
+                f"(?P<prefix>{'|'.join(re.escape(p) for p in prefixes)})?")
+        parts.append("(?P<base>.*?)")
+        if suffixes:
+            parts.append(
+                f"(?P<suffix>{'|'.join(re.escape(x) for x in suffixes)})?")
+        parts.append("$")
+        return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+    def classify(self, name, item_type=None):
+        """Return (base_name, is_base, is_compressed) for name"""
+        match = self._patterns.get(item_type, self._default).match(name)
+        groups = match.groupdict()
+        if groups.get("prefix") or groups.get("suffix"):
+            return groups["base"].strip(), False, bool(groups.get("compressed"))
+        return name, True, bool(groups.get("compressed"))
+
+    def is_compressed(self, name):
+        return bool(self._compressed and self._compressed.search(name))
+
+
+_variant_classifier = None
+
+
+def get_variant_classifier():
+    """Load and compile ORE_VARIANTS_PATH once per run"""
+    global _variant_classifier
+    if _variant_classifier is None:
+        rules = {}
+        if os.path.exists(ORE_VARIANTS_PATH):
+            with open(ORE_VARIANTS_PATH, "r", encoding="utf-8") as f:
+                rules = json.load(f)
+        else:
+            print(f"⚠️ Missing: {ORE_VARIANTS_PATH} (no variant or compressed rules)")
+        _variant_classifier = VariantClassifier(rules, ORE_VARIANTS_PATH)
+    return _variant_classifier
+
+
 def is_compressed_ore(name):
     """Check if an ore name indicates it's compressed"""
-    name_lower = name.lower()
-    return any(keyword in name_lower for keyword in COMPRESSED_KEYWORDS)
+    return get_variant_classifier().is_compressed(name)
 
 
-def group_ore_subtypes(items, item_type):
-    """Group ore/ice/moon ore subtypes by base name with proper nesting"""
-    subtypes = {}
+@instrumented("group_ore_subtypes")
+def group_ore_subtypes(items, item_type, classified=None):
+    """Group ore/ice/moon ore subtypes by base name with proper nesting.
 
-    # Define prefixes for each type
-    if item_type == "ore":
-        prefixes = ["concentrated ", "dense ", "solid ", "thick ", "prismatic ",
-                    "luminous ", "gleaming ", "condensed ", "massive ", "smooth "]
-    elif item_type == "ice":
-        prefixes = ["enriched ", "thick ",
-                    "pristine ", "smooth ", "crystalline "]
-    elif item_type == "moon_ore":
-        prefixes = ["concentrated ", "dense ", "solid ", "thick ", "prismatic ",
-                    "luminous ", "gleaming ", "condensed ", "massive ", "smooth "]
-    else:
-        prefixes = []
+    classified maps typeID -> (base_name, is_base) from an earlier
+    classify() of the same names; anything missing is classified here.
+    """
+    subtypes = {}
+    classifier = get_variant_classifier()
+    classified = classified or {}
 
     # First pass: identify all base types and their variants
     base_variants = {}
 
     for item in items:
-        name = item["name"]
-        name_lower = name.lower()
-        base_name = None
-        is_base = True
-
-        # Try to identify base name by removing common prefixes
-        for prefix in prefixes:
-            if name_lower.startswith(prefix):
-                base_name = name[len(prefix):].strip()
-                is_base = False
-                break
-
-        # If no prefix found, this is the base item
-        if base_name is None:
-            base_name = name
-            is_base = True
+        # Variant prefixes/suffixes are stripped to find the base name
+        if item["typeID"] in classified:
+            base_name, is_base = classified[item["typeID"]]
+        else:
+            base_name, is_base, _ = classifier.classify(item["name"], item_type)
 
         if base_name not in base_variants:
             base_variants[base_name] = {
@@ -469,12 +1621,14 @@ def group_ore_subtypes(items, item_type):
     return dict(sorted(subtypes.items()))
 
 
-def extract_ores_ice_and_moon_ores():
+@instrumented("extract_ores_ice_and_moon_ores")
+def extract_ores_ice_and_moon_ores(sde=None):
     print("\n⛏ Extracting ores, ice, moon ores, minerals, and gas...")
 
-    types = load_yaml(TYPES_PATH)
-    materials = load_yaml(TYPE_MATERIALS_PATH)
-    groups = load_yaml(GROUPS_PATH)
+    sde = sde or SDE()
+    types = sde.type_records
+    materials = sde.type_materials
+    groups = sde.groups
 
     # Refined material info (needed early)
     all_refined_type_ids, refined_items = extract_all_refined_type_ids_and_items(
@@ -488,17 +1642,17 @@ def extract_ores_ice_and_moon_ores():
 
     # Identify ore, ice, gas, and moon ore group IDs
     ore_groups = {
-        int(gid) for gid, g in groups.items()
+        gid for gid, g in groups.items()
         if g.get("categoryID") == ASTEROID_CATEGORY_ID
     }
 
     ice_groups = {
-        int(gid) for gid, g in groups.items()
+        gid for gid, g in groups.items()
         if g.get("categoryID") == ICE_CATEGORY_ID and "ice" in g.get("name", {}).get("en", "").lower()
     }
 
     gas_groups = {
-        int(gid) for gid, g in groups.items()
+        gid for gid, g in groups.items()
         if g.get("categoryID") == GAS_CATEGORY_ID
     }
 
@@ -511,16 +1665,17 @@ def extract_ores_ice_and_moon_ores():
 
     # Initialize categorized collections
     ores, ice_items, moon_ores, minerals, gas_clouds = [], [], [], [], []
+    classifier = get_variant_classifier()
+    classified = {}  # typeID -> (base_name, is_base), reused by group_ore_subtypes
 
     # Process all published item types
-    for tid, tdata in types.items():
-        if not tdata.get("published", False):
+    for type_id, record in types.items():
+        if not record.published:
             continue
 
-        type_id = int(tid)
-        group_id = tdata.get("groupID")
-        name = tdata.get("name", {}).get("en", "")
-        volume = tdata.get("volume", 1.0)
+        group_id = record.group_id
+        name = record.name if record.name is not None else ""
+        volume = record.volume if record.volume is not None else 1.0
         group_name = groups.get(group_id, {}).get(
             "name", {}).get("en", "Unknown")
 
@@ -538,22 +1693,30 @@ def extract_ores_ice_and_moon_ores():
             "refined_output": refined
         }
 
-        # Categorize entry
-        if group_id in moon_ore_groups and not is_compressed_ore(name):
-            moon_ores.append(entry)
-        elif group_id in ore_groups and not is_compressed_ore(name):
-            ores.append(entry)
-        elif group_id in ice_groups and not is_compressed_ore(name):
-            ice_items.append(entry)
+        # Categorize entry; one classify() gives both the compressed check and the base name
+        if group_id in moon_ore_groups:
+            target, item_type = moon_ores, "moon_ore"
+        elif group_id in ore_groups:
+            target, item_type = ores, "ore"
+        elif group_id in ice_groups:
+            target, item_type = ice_items, "ice"
+        else:
+            target = item_type = None
+        compressed = False
+        if target is not None:
+            base_name, is_base, compressed = classifier.classify(name, item_type)
+        if target is not None and not compressed:
+            target.append(entry)
+            classified[type_id] = (base_name, is_base)
         elif type_id in all_refined_type_ids:
             minerals.append(entry)
         elif group_id in gas_groups:
             gas_clouds.append(entry)
 
     # Group into subtypes
-    ore_subtypes = group_ore_subtypes(ores, "ore")
-    ice_subtypes = group_ore_subtypes(ice_items, "ice")
-    moon_ore_subtypes = group_ore_subtypes(moon_ores, "moon_ore")
+    ore_subtypes = group_ore_subtypes(ores, "ore", classified)
+    ice_subtypes = group_ore_subtypes(ice_items, "ice", classified)
+    moon_ore_subtypes = group_ore_subtypes(moon_ores, "moon_ore", classified)
 
     print(f"⛏ Found {len(ores)} raw ore types")
     print(f"🧊 Found {len(ice_items)} ice types")
@@ -584,12 +1747,74 @@ def extract_ores_ice_and_moon_ores():
 
     write_json("refined_outputs.json", refined_items)
 
+    # Sparse ore x material yields for vectorized valuation (sdeReprocessing.RefineMatrix)
+    if sdeReprocessing is not None:
+        with stage("refine_matrix"):
+            matrix = sdeReprocessing.build_refine_matrix(
+                ores + ice_items + moon_ores)
+            matrix.save("refine_matrix.npz")
+        print(f"💾 Exported: refine_matrix.npz ({matrix.shape[0]} x {matrix.shape[1]})")
+    else:
+        print("⚠️ numpy not installed; skipping refine_matrix.npz")
 
-# ─── Main CLI ──────────────────────────────────────────────
 
+# ─── Main CLI ──────────────────────────────────────────────
 
-def main():
-    print("\n🛠 EVE Data Extractor")
+TARGETS = ("locations", "market", "resources")
+MENU_TARGETS = {
+    "1": ("market",),
+    "2": ("locations",),
+    "3": ("locations", "market"),
+    "4": ("resources",),
+    "5": TARGETS,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract market, location and resource JSON from the EVE SDE. "
+                    "Without a target an interactive menu is shown.")
+    parser.add_argument("target", nargs="?", choices=TARGETS + ("all",),
+                        help="what to build; 'all' runs the extractors concurrently")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="concurrent extractors and universe worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild even if the build manifest says outputs are current")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="bypass the parsed YAML cache")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="empty the parsed YAML cache before running")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="parse types.yaml as one document instead of in batches")
+    parser.add_argument("--flat", action="store_true",
+                        help="also write market_flat.json, the market groups as a flat list")
+    parser.add_argument("--shard", nargs="?", type=int, const=1, default=0, metavar="DEPTH",
+                        help="also split market.json into content-hashed files per market group "
+                             "at DEPTH (default 1: top-level groups) with a market_index.json")
+    parser.add_argument("--icon-atlas", action="store_true",
+                        help="pack icons/ into per-size atlases (needs Pillow) and reference them from market.json")
+    parser.add_argument("--variants", default=ORE_VARIANTS_PATH, metavar="PATH",
+                        help="ore/ice variant and compressed-name rules (default: ore_variants.json)")
+    parser.add_argument("--compact", action="store_true",
+                        help="write JSON without indentation")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"run targets serially under cProfile, dumping pstats to {PROFILE_DIR}/")
+    parser.add_argument("--report", default=PROFILE_REPORT_PATH,
+                        help="where to write the per-stage timing/IO/memory JSON report")
+    parser.add_argument("--sqlite", nargs="?", const="sde.sqlite", metavar="PATH",
+                        help="also export the outputs to an indexed SQLite file (default: sde.sqlite)")
+    parser.add_argument("--search", nargs="?", const="search_index.json", metavar="PATH",
+                        help="also build the type/system/station name search index "
+                             "(default: search_index.json)")
+    compression = parser.add_mutually_exclusive_group()
+    compression.add_argument("--gzip", action="store_const", dest="compression",
+                             const="gzip", help="write .json.gz outputs")
+    compression.add_argument("--zstd", action="store_const", dest="compression",
+                             const="zstd", help="write .json.zst outputs (needs zstandard)")
+    return parser.parse_args(argv)
+
+
+def choose_targets():
     print("1) Build Market")
     print("2) Build Locations")
     print("3) Build Both Market & Locations")
@@ -597,21 +1822,144 @@ def main():
     print("5) Build All")
 
     choice = input("Enter choice [1–5]: ").strip()
-    if choice not in ("1", "2", "3", "4", "5"):
+    if choice not in MENU_TARGETS:
         print("⚠️ Invalid selection.")
-        return
-
-    if choice in ("2", "3", "5"):
-        extract_locations()
-
-    if choice in ("1", "3", "5"):
-        extract_market()
+        return ()
+    return MENU_TARGETS[choice]
+
+
+def run_targets(targets, jobs, profile=False):
+    """Run the selected extractors over one shared SDE; returns {target: seconds}
+
+    With profile, targets run one after another, each under its own
+    cProfile, dumped to PROFILE_DIR/<target>.pstats.
+    """
+    # One SDE per run, so Build All parses types.yaml once for every extractor
+    sde = SDE(stream_workers=jobs)
+    manifest = load_build_manifest()
+
+    def locations():
+        extract_locations(sde, manifest=manifest)
+        extract_jump_graph(sde, manifest=manifest)
+
+    def icons():
+        from sdeIcons import build_icon_atlases
+        with stage("build_icon_atlases"):
+            build_icon_atlases({icon_id: data.get("iconFile") for icon_id, data in sde.icon_ids.items()},
+                               workers=jobs, force=FORCE_REBUILD)
+
+    stages = {
+        "locations": locations,
+        "icons": icons,
+        "market": lambda: build_if_changed(manifest, "market", MARKET_INPUTS,
+                                           MARKET_OUTPUTS + (["market_flat.json"] if MARKET_FLAT else [])
+                                           + ([MARKET_INDEX_PATH] if MARKET_SHARD_DEPTH else []),
+                                           lambda: extract_market(sde),
+                                           market_shards_exist if MARKET_SHARD_DEPTH else None),
+        "resources": lambda: build_if_changed(manifest, "resources", RESOURCE_INPUTS, RESOURCE_OUTPUTS,
+                                              lambda: extract_ores_ice_and_moon_ores(sde)),
+    }
+    timings = {}
+
+    def run_stage(target):
+        started = time.perf_counter()
+        if profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(stages[target])
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{target}.pstats"))
+        else:
+            stages[target]()
+        timings[target] = time.perf_counter() - started
+
+    # The extractors share no outputs; locations fans out to its own processes.
+    # Only one profiler can be active at a time, so profiling runs serially.
+    workers = 1 if profile else max(1, min(jobs, len(targets)))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in as_completed([executor.submit(run_stage, t) for t in targets]):
+                future.result()
+    else:
+        for target in targets:
+            run_stage(target)
+
+    save_build_manifest(manifest)
+    return timings
+
+
+def main(argv=None):
+    global YAML_CACHE_ENABLED, JSON_COMPACT, JSON_COMPRESSION, FORCE_REBUILD, STREAM_TYPES, MARKET_FLAT
+    global ORE_VARIANTS_PATH, ICON_ATLAS, MARKET_SHARD_DEPTH
+
+    args = parse_args(argv)
+    if args.compression == "zstd" and zstandard is None:
+        print("⚠️ --zstd needs zstandard (pip install zstandard)")
+        return 1
+    if args.clear_cache:
+        clear_yaml_cache()
+    YAML_CACHE_ENABLED = not args.no_cache
+    JSON_COMPACT = args.compact
+    JSON_COMPRESSION = args.compression
+    FORCE_REBUILD = args.force
+    STREAM_TYPES = not args.no_stream
+    MARKET_FLAT = args.flat
+    MARKET_SHARD_DEPTH = max(0, args.shard)
+    if os.path.abspath(args.variants) != ORE_VARIANTS_PATH:
+        RESOURCE_INPUTS[RESOURCE_INPUTS.index(ORE_VARIANTS_PATH)] = os.path.abspath(args.variants)
+        ORE_VARIANTS_PATH = os.path.abspath(args.variants)
 
-    if choice in ("4", "5"):
-        extract_ores_ice_and_moon_ores()
+    print("\n🛠 EVE Data Extractor")
+    print(f"📖 YAML backend: {YAML_BACKEND}")
+
+    if args.target is None:
+        targets = choose_targets()
+        if not targets:
+            return
+    elif args.target == "all":
+        targets = TARGETS
+    else:
+        targets = (args.target,)
 
+    if args.icon_atlas:
+        import sdeIcons
+        if sdeIcons.Image is None:
+            print("⚠️ --icon-atlas needs Pillow (pip install Pillow); skipping icon atlases")
+        else:
+            ICON_ATLAS = True
+            targets = tuple(targets) + ("icons",)
+
+    started = time.perf_counter()
+    timings = run_targets(targets, max(1, args.jobs), args.profile)
+
+    if args.sqlite:
+        from sdeSqlite import export_sqlite
+        export_started = time.perf_counter()
+        with stage("export_sqlite"):
+            export_sqlite(".", args.sqlite, JSON_EXTENSIONS[JSON_COMPRESSION])
+        timings["sqlite"] = time.perf_counter() - export_started
+        targets = tuple(targets) + ("sqlite",)
+
+    if args.search:
+        from sdeSearch import export_search_index
+        export_started = time.perf_counter()
+        with stage("export_search"):
+            export_search_index(".", args.search, JSON_EXTENSIONS[JSON_COMPRESSION])
+        timings["search"] = time.perf_counter() - export_started
+        targets = tuple(targets) + ("search",)
+
+    if YAML_CACHE_ENABLED:
+        prune_yaml_cache()
+
+    report_yaml_stats()
+    print("\n⏱  Stage timings:")
+    for target in targets:
+        print(f"   {target:<10} {timings[target]:8.2f}s")
+    print(f"   {'total':<10} {time.perf_counter() - started:8.2f}s")
+    write_profile_report(args.report, timings)
+    if args.profile:
+        print(f"💾 cProfile stats in {PROFILE_DIR}/ (python -m pstats {PROFILE_DIR}/<target>.pstats)")
     print("\n✅ Complete!")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,414 @@
+import os
+import io
+import sys
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+
+from sdeQuery import OUTPUT_EXTENSIONS, load_output
+
+EXTRACTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sdeDataExtractor.py")
+DELTA_VERSION = 1
+ROOT = "root"  # Key of the pseudo-record holding top-level order (and market.json's _info)
+
+# Subtype maps are derived from their lists, so deltas only carry them when
+# recomputing would not reproduce the new file: key -> (list key, item type)
+DERIVED_SUBTYPES = {
+    "ore_subtypes": ("ores", "ore"),
+    "ice_subtypes": ("ice", "ice"),
+    "moon_ore_subtypes": ("moon_ores", "moon_ore"),
+}
+
+# ─── Keyed Views ───────────────────────────────────────────
+# Each output is flattened into {collection: {key: record}} hash maps, with
+# order kept in parent records, so diffs compare records by key instead of
+# walking two trees side by side; unflatten rebuilds the exact output.
+
+
+def _flatten_market(market):
+    groups = {ROOT: {"children": []}}
+    types = {}
+    if "_info" in market:
+        groups[ROOT]["_info"] = market["_info"]
+    stack = [(ROOT, name, node) for name, node in reversed(list(market.items())) if name != "_info"]
+    while stack:
+        parent, name, node = stack.pop()
+        info = node["_info"]
+        mgid = info["marketGroupID"]
+        groups[parent]["children"].append(mgid)
+        record = {"name": name, "_info": info}
+        if "items" in node:
+            record["items"] = [item["typeID"] for item in node["items"]]
+            for item in node["items"]:
+                types[item["typeID"]] = item
+        else:
+            record["children"] = []
+            stack.extend((mgid, child_name, child) for child_name, child in reversed(list(node.items()))
+                         if child_name != "_info")
+        groups[mgid] = record
+    return {"groups": groups, "types": types}
+
+
+def _unflatten_market(view):
+    groups, types = view["groups"], view["types"]
+    built = {}
+    stack = [(ROOT, False)]
+    while stack:
+        key, expanded = stack.pop()
+        record = groups[key]
+        if "items" in record:
+            built[key] = {"_info": record["_info"], "items": [types[t] for t in record["items"]]}
+        elif not expanded:
+            stack.append((key, True))
+            stack.extend((child, False) for child in reversed(record["children"]))
+        else:
+            node = {"_info": record["_info"]} if key == ROOT and "_info" in record else {}
+            for child in record["children"]:
+                node[groups[child]["name"]] = built.pop(child)
+            if key != ROOT:
+                node["_info"] = record["_info"]
+            built[key] = node
+    return built[ROOT]
+
+
+def _flatten_locations(locations):
+    view = {"regions": {ROOT: {"children": []}}, "constellations": {}, "systems": {}, "stations": {}}
+    for region_name, region in locations.items():
+        region_key = str(region["regionID"])
+        view["regions"][ROOT]["children"].append(region_key)
+        region_record = {"name": region_name, "regionID": region["regionID"], "children": []}
+        for const_name, const in region.items():
+            if const_name == "regionID":
+                continue
+            const_key = str(const["constellationID"])
+            region_record["children"].append(const_key)
+            const_record = {"name": const_name, "constellationID": const["constellationID"],
+                            "children": []}
+            for system_name, system in const.items():
+                if system_name == "constellationID":
+                    continue
+                system_key = str(system["solarSystemID"])
+                const_record["children"].append(system_key)
+                # Same key order as the system object; stations become their IDs
+                system_record = {"name": system_name}
+                for field, value in system.items():
+                    system_record[field] = list(value) if field == "stations" else value
+                for station_id, station in system["stations"].items():
+                    view["stations"][station_id] = station
+                view["systems"][system_key] = system_record
+            view["constellations"][const_key] = const_record
+        view["regions"][region_key] = region_record
+    return view
+
+
+def _unflatten_locations(view):
+    regions, constellations = view["regions"], view["constellations"]
+    systems, stations = view["systems"], view["stations"]
+    locations = {}
+    for region_key in regions[ROOT]["children"]:
+        region_record = regions[region_key]
+        region = {"regionID": region_record["regionID"]}
+        for const_key in region_record["children"]:
+            const_record = constellations[const_key]
+            const = {"constellationID": const_record["constellationID"]}
+            for system_key in const_record["children"]:
+                system_record = systems[system_key]
+                const[system_record["name"]] = {
+                    field: ({sid: stations[sid] for sid in value} if field == "stations" else value)
+                    for field, value in system_record.items() if field != "name"}
+            region[const_record["name"]] = const
+        locations[region_record["name"]] = region
+    return locations
+
+
+def _keyed_list(entries):
+    return {str(entry["typeID"]): entry for entry in entries}
+
+
+def _flatten_resources(data):
+    """ores.json-style files: typeID-keyed lists plus derived subtype maps"""
+    if isinstance(data, list):
+        return {"": _keyed_list(data)}
+    return {key: _keyed_list(value) for key, value in data.items() if key not in DERIVED_SUBTYPES}
+
+
+def _recompute_subtypes(data):
+    from sdeDataExtractor import group_ore_subtypes
+    for key, (list_key, item_type) in DERIVED_SUBTYPES.items():
+        if key in data and list_key in data:
+            data[key] = group_ore_subtypes(data[list_key], item_type)
+    return data
+
+
+FLATTENERS = {
+    "market.json": (_flatten_market, _unflatten_market),
+    "locations.json": (_flatten_locations, _unflatten_locations),
+}
+RESOURCE_FILES = ("ores.json", "ice.json", "moon_ore.json", "gas_clouds.json", "refined_outputs.json")
+# Not keyed: shipped whole when they change
+WHOLE_FILES = ("jump_graph.json",)
+DELTA_FILES = tuple(FLATTENERS) + RESOURCE_FILES + WHOLE_FILES
+
+# ─── Diff ──────────────────────────────────────────────────
+
+
+def _digest(data):
+    # Key order matters: the patched file must match byte for byte, not just by value
+    return hashlib.blake2b(json.dumps(data).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def diff_keyed(old, new, order=False):
+    """added/removed/changed between two {key: record} maps; None when equal.
+
+    With order, the new key order is recorded whenever applying the
+    changes to the old order (removals dropped, additions appended) would
+    not reproduce it.
+    """
+    added = {key: record for key, record in new.items() if key not in old}
+    removed = [key for key in old if key not in new]
+    changed = {key: record for key, record in new.items() if key in old and old[key] != record}
+    delta = {}
+    if added:
+        delta["added"] = added
+    if removed:
+        delta["removed"] = removed
+    if changed:
+        delta["changed"] = changed
+    if order:
+        expected = [key for key in old if key in new] + list(added)
+        if expected != list(new):
+            delta["order"] = list(new)
+    return delta or None
+
+
+def patch_keyed(records, delta):
+    """Apply a diff_keyed delta to records in place; returns records"""
+    for key in delta.get("removed", []):
+        del records[key]
+    records.update(delta.get("changed", {}))
+    records.update(delta.get("added", {}))
+    if "order" in delta:
+        reordered = {key: records[key] for key in delta["order"]}
+        records.clear()
+        records.update(reordered)
+    return records
+
+
+def diff_file(name, old, new):
+    """Delta for one output; None when unchanged"""
+    # The delta needs both digests anyway, and equal digests mean equal bytes
+    base = {"base": _digest(old), "result": _digest(new)}
+    if base["base"] == base["result"]:
+        return None
+    if name in FLATTENERS:
+        flatten = FLATTENERS[name][0]
+        old_view, new_view = flatten(old), flatten(new)
+        collections = {key: diff_keyed(old_view[key], new_view[key]) for key in new_view}
+        collections = {k: v for k, v in collections.items() if v}
+        if collections:
+            return dict(base, collections=collections)
+        # Same records in another order: no keyed change would reproduce it
+        return dict(base, full=new)
+    if name in RESOURCE_FILES and type(old) is type(new) and (
+            isinstance(new, list) or list(old) == list(new)):
+        old_view, new_view = _flatten_resources(old), _flatten_resources(new)
+        delta = dict(base, collections={})
+        for key in new_view:
+            collection = diff_keyed(old_view[key], new_view[key], order=True)
+            if collection:
+                delta["collections"][key] = collection
+        if isinstance(new, dict):
+            # Subtypes normally follow from the lists; ship them only if they do not
+            recomputed = _recompute_subtypes(dict(new))
+            overrides = {key: new[key] for key in DERIVED_SUBTYPES
+                         if key in new and recomputed[key] != new[key]}
+            if overrides:
+                delta["subtypes"] = overrides
+        return delta
+    return dict(base, full=new)
+
+
+def _load_optional(directory, name):
+    try:
+        return load_output(directory, name)
+    except FileNotFoundError:
+        return None
+
+
+def diff_outputs(old_dir, new_dir, files=DELTA_FILES):
+    """Delta between two directories of extractor outputs"""
+    delta = {"version": DELTA_VERSION, "files": {}}
+    for name in files:
+        started = time.perf_counter()
+        old, new = _load_optional(old_dir, name), _load_optional(new_dir, name)
+        if old is None and new is None:
+            continue
+        if new is None:
+            delta["files"][name] = {"deleted": True}
+        elif old is None:
+            delta["files"][name] = {"result": _digest(new), "full": new}
+        else:
+            file_delta = diff_file(name, old, new)
+            if file_delta is None:
+                print(f"   {name:<22} unchanged")
+                continue
+            delta["files"][name] = file_delta
+        print(f"   {name:<22} changed ({time.perf_counter() - started:.2f}s)")
+    return delta
+
+
+def run_extractor(sde_parent, jobs=None):
+    """Build every output next to an SDE (sde_parent holds its sde/ folder)"""
+    cmd = [sys.executable, EXTRACTOR_PATH, "all"]
+    if jobs:
+        cmd += ["--jobs", str(jobs)]
+    print(f"🛠  Extracting {sde_parent}...")
+    subprocess.run(cmd, cwd=sde_parent, check=True, stdout=subprocess.DEVNULL)
+
+
+def diff_sdes(old_parent, new_parent, jobs=None):
+    """Run the extractors against two SDEs, then diff their outputs"""
+    for parent in (old_parent, new_parent):
+        if not os.path.isdir(os.path.join(parent, "sde")):
+            raise FileNotFoundError(f"no sde/ folder in {parent}")
+        run_extractor(parent, jobs)
+    return diff_outputs(old_parent, new_parent)
+
+# ─── Apply ─────────────────────────────────────────────────
+
+
+def _output_path(directory, name):
+    for ext in OUTPUT_EXTENSIONS:
+        path = os.path.join(directory, name + ext)
+        if os.path.exists(path):
+            return path
+    return os.path.join(directory, name)
+
+
+def _write_output(path, data, compact=False):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    text = json.dumps(data, separators=(",", ":")) if compact else json.dumps(data, indent=2)
+    if path.endswith(".gz"):
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(text)
+    elif path.endswith(".zst"):
+        import zstandard
+        with open(tmp, "wb") as raw:
+            with io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding="utf-8") as f:
+                f.write(text)
+    else:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+    os.replace(tmp, path)
+
+
+def apply_file(name, old, file_delta):
+    """Patched copy of one output"""
+    if "full" in file_delta:
+        return file_delta["full"]
+    if name in FLATTENERS:
+        flatten, unflatten = FLATTENERS[name]
+        view = flatten(old)
+        for key, collection in file_delta["collections"].items():
+            patch_keyed(view[key], collection)
+        return unflatten(view)
+
+    view = _flatten_resources(old)
+    for key, collection in file_delta["collections"].items():
+        patch_keyed(view[key], collection)
+    if isinstance(old, list):
+        return list(view[""].values())
+    data = {key: (list(view[key].values()) if key in view else value) for key, value in old.items()}
+    _recompute_subtypes(data)
+    data.update(file_delta.get("subtypes", {}))
+    return data
+
+
+def apply_delta(directory, delta, compact=False, force=False):
+    """Patch the outputs in directory in place; returns the names written.
+
+    Each file's current content must hash to the delta's base (the old
+    output it was computed from) unless force is set.
+    """
+    if delta.get("version") != DELTA_VERSION:
+        raise ValueError(f"unsupported delta version {delta.get('version')}")
+
+    # Every file is patched and verified before any is written
+    patched = {}
+    for name, file_delta in delta["files"].items():
+        if file_delta.get("deleted"):
+            patched[name] = None
+            continue
+        old = _load_optional(directory, name)
+        if "full" not in file_delta:
+            if old is None:
+                raise FileNotFoundError(f"{name} not found in {directory}")
+            if not force and _digest(old) != file_delta["base"]:
+                raise ValueError(f"{name} is not the output this delta was made from")
+        new = apply_file(name, old, file_delta)
+        if _digest(new) != file_delta["result"]:
+            raise ValueError(f"patching {name} did not reproduce the new output")
+        patched[name] = new
+
+    for name, new in patched.items():
+        path = _output_path(directory, name)
+        if new is None:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            _write_output(path, new, compact)
+    return list(patched)
+
+
+def save_delta(delta, path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        json.dump(delta, f, separators=(",", ":"))
+
+
+def load_delta(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+# ─── Main CLI ──────────────────────────────────────────────
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff extractor outputs and patch old outputs forward.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    diff = sub.add_parser("diff", help="write a delta between two output directories")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("-o", "--out", default="sde_delta.json.gz")
+    diff.add_argument("--sde", action="store_true",
+                      help="old and new hold an sde/ folder; run the extractors there first")
+    diff.add_argument("-j", "--jobs", type=int, help="passed to the extractor with --sde")
+    apply = sub.add_parser("apply", help="patch the outputs in a directory with a delta")
+    apply.add_argument("delta")
+    apply.add_argument("--dir", default=".")
+    apply.add_argument("--compact", action="store_true", help="write patched files without indentation")
+    apply.add_argument("--force", action="store_true", help="patch even if the base outputs differ")
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        print(f"🔍 Diffing {args.old} -> {args.new}")
+        delta = diff_sdes(args.old, args.new, args.jobs) if args.sde else diff_outputs(args.old, args.new)
+        save_delta(delta, args.out)
+        print(f"💾 Exported: {args.out} ({os.path.getsize(args.out)} bytes, {len(delta['files'])} files)")
+        return 0
+
+    try:
+        written = apply_delta(args.dir, load_delta(args.delta), args.compact, args.force)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"⚠️ {e}")
+        return 1
+    print(f"✅ Patched {', '.join(written) or 'nothing'} in {args.dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import os
+import sys
+import json
+import struct
+import hashlib
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Atlases need Pillow; everything else here does not
+    Image = None
+
+# ─── Icon Atlases ──────────────────────────────────────────
+ICONS_ROOT = "icons"
+ICON_ATLAS_DIR = "icon_atlases"
+ICON_MANIFEST_PATH = "icon_manifest.json"
+ICON_MANIFEST_VERSION = 1
+ATLAS_MAX_PX = 2048  # Atlas edge length; 64px icons pack 1024 to an atlas
+# Where an iconFile name from iconIDs.yaml is looked for, in order
+ICON_DIR_PRIORITY = ("items", "types", "corporations", "alliances")
+# The extractor runs this step on a worker thread, where forking is unsafe
+POOL_CONTEXT = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+
+
+def png_size(path):
+    """(width, height) from the PNG header; None for anything that is not a PNG"""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if len(header) < 24 or header[:8] != b"\x89PNG\r\n\x1a\n":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+def _content_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_icons(root, previous_stats, previous_files, force=False):
+    """{relpath: (hash, width, height)} for every PNG under root.
+
+    Files whose size and mtime match the previous manifest keep their hash
+    without being read again.
+    """
+    icons = {}
+    stats = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            st = os.stat(path)
+            stat = [st.st_size, st.st_mtime_ns]
+            old = previous_stats.get(rel)
+            if not force and old and old[:2] == stat and rel in previous_files:
+                icons[rel] = (previous_files[rel], old[2], old[3])
+                stats[rel] = old
+                continue
+            size = png_size(path)
+            if size is None:
+                continue
+            icons[rel] = (_content_hash(path),) + size
+            stats[rel] = stat + list(size)
+    return icons, stats
+
+
+def _atlas_layout(width, height):
+    columns = max(1, ATLAS_MAX_PX // width)
+    rows = max(1, ATLAS_MAX_PX // height)
+    return columns, columns * rows
+
+
+def _render_atlas(task):
+    """Process-pool entry point: paste one atlas's tiles and write it as PNG"""
+    path, tile_w, tile_h, columns, tiles = task
+    used_rows = max(slot for slot, _ in tiles) // columns + 1
+    atlas = Image.new("RGBA", (columns * tile_w, used_rows * tile_h), (0, 0, 0, 0))
+    for slot, source in tiles:
+        with Image.open(source) as icon:
+            atlas.paste(icon.convert("RGBA"), ((slot % columns) * tile_w, (slot // columns) * tile_h))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    atlas.save(tmp, format="PNG")
+    os.replace(tmp, path)
+    return path, atlas.size
+
+
+def load_icon_manifest(path=ICON_MANIFEST_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == ICON_MANIFEST_VERSION else {}
+
+
+def build_icon_atlases(icon_ids=None, root=ICONS_ROOT, out_dir=".", workers=None, force=False):
+    """Deduplicate icons by content and pack them into per-size atlases.
+
+    icon_ids maps iconID -> iconFile name (as iconIDs.yaml gives it). Each
+    distinct image keeps its atlas slot between builds, so only atlases
+    that gained, lost or changed a tile are repainted, in parallel.
+    Writes icon_manifest.json and returns it.
+    """
+    if Image is None:
+        raise RuntimeError("icon atlases need Pillow (pip install Pillow)")
+    manifest_path = os.path.join(out_dir, ICON_MANIFEST_PATH)
+    atlas_dir = os.path.join(out_dir, ICON_ATLAS_DIR)
+    previous = {} if force else load_icon_manifest(manifest_path)
+
+    icons, stats = scan_icons(root, previous.get("stats", {}), previous.get("files", {}), force)
+    unique = {}
+    for rel, (digest, width, height) in icons.items():
+        unique.setdefault(digest, (rel, width, height))
+    print(f"🖼️  {len(icons)} icons, {len(unique)} distinct images")
+
+    # Keep every surviving tile where it was; freed slots are reused first
+    tiles = {digest: tile for digest, tile in previous.get("tiles", {}).items()
+             if digest in unique and os.path.exists(os.path.join(out_dir, tile["file"]))}
+    atlases = {}
+    for name, atlas in previous.get("atlases", {}).items():
+        atlases[name] = dict(atlas, slots=set())
+    for digest, tile in tiles.items():
+        atlases[tile["atlas"]]["slots"].add(tile["slot"])
+    dirty = {name for name, atlas in previous.get("atlases", {}).items()
+             if len(atlases[name]["slots"]) != atlas["tiles"]}
+
+    for digest, (rel, width, height) in sorted(unique.items(), key=lambda item: item[1][0]):
+        if digest in tiles:
+            continue
+        columns, capacity = _atlas_layout(width, height)
+        bucket = f"{width}x{height}"
+        name = next((n for n, a in sorted(atlases.items(), key=lambda item: item[1]["index"])
+                     if a["bucket"] == bucket and len(a["slots"]) < capacity), None)
+        if name is None:
+            # Next number after the highest; emptied atlases may have left gaps
+            index = max((a["index"] for a in atlases.values() if a["bucket"] == bucket), default=-1) + 1
+            name = f"{bucket}_{index}"
+            atlases[name] = {"bucket": bucket, "index": index, "file": f"{ICON_ATLAS_DIR}/{name}.png",
+                             "tileWidth": width, "tileHeight": height, "columns": columns,
+                             "slots": set()}
+        atlas = atlases[name]
+        slot = next(s for s in range(capacity) if s not in atlas["slots"])
+        atlas["slots"].add(slot)
+        tiles[digest] = {"atlas": name, "file": atlas["file"], "slot": slot,
+                         "x": (slot % columns) * width, "y": (slot // columns) * height,
+                         "w": width, "h": height}
+        dirty.add(name)
+
+    # Repaint only atlases whose tiles changed (or whose file is gone)
+    sources = {digest: os.path.join(root, rel) for digest, (rel, _, _) in unique.items()}
+    dirty |= {name for name, atlas in atlases.items()
+              if not os.path.exists(os.path.join(out_dir, atlas["file"]))}
+    tasks = []
+    removed = 0
+    for name in sorted(dirty):
+        atlas = atlases[name]
+        atlas_tiles = sorted((tile["slot"], sources[digest])
+                             for digest, tile in tiles.items() if tile["atlas"] == name)
+        if not atlas_tiles:
+            path = os.path.join(out_dir, atlas["file"])
+            if os.path.exists(path):
+                os.remove(path)
+            del atlases[name]
+            removed += 1
+            continue
+        tasks.append((os.path.join(out_dir, atlas["file"]), atlas["tileWidth"],
+                      atlas["tileHeight"], atlas["columns"], atlas_tiles))
+
+    if tasks:
+        os.makedirs(atlas_dir, exist_ok=True)
+        print(f"🧩 Packing {len(tasks)} of {len(atlases)} atlases...")
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as executor:
+                list(executor.map(_render_atlas, tasks))
+        else:
+            for task in tasks:
+                _render_atlas(task)
+    elif not removed:
+        print("⏭️ Icon atlases up to date")
+    if removed:
+        print(f"🗑️  Removed {removed} emptied atlas{'es' if removed > 1 else ''}")
+
+    files = {rel: digest for rel, (digest, _, _) in icons.items()}
+    by_name = {}
+    for rel in sorted(files, key=lambda r: (ICON_DIR_PRIORITY.index(r.split("/")[0])
+                                            if r.split("/")[0] in ICON_DIR_PRIORITY
+                                            else len(ICON_DIR_PRIORITY), r)):
+        by_name.setdefault(rel.rsplit("/", 1)[-1], rel)
+    icon_tiles = {}
+    for icon_id, icon_file in sorted((icon_ids or {}).items()):
+        rel = by_name.get((icon_file or "").split("/")[-1])
+        if rel is not None:
+            icon_tiles[str(icon_id)] = files[rel]
+    type_tiles = {rel[len("types/"):-len(".png")]: digest for rel, digest in files.items()
+                  if rel.startswith("types/") and rel[len("types/"):-len(".png")].isdigit()}
+
+    manifest = {
+        "version": ICON_MANIFEST_VERSION,
+        "atlases": {name: dict({key: atlas[key] for key in
+                                ("bucket", "index", "file", "tileWidth", "tileHeight", "columns")},
+                               tiles=len(atlas["slots"]))
+                    for name, atlas in sorted(atlases.items())},
+        "tiles": tiles,
+        "iconIDs": icon_tiles,
+        "typeIDs": type_tiles,
+        "files": files,
+        "stats": stats,
+    }
+    tmp = f"{manifest_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp, manifest_path)
+    print(f"💾 Exported: {manifest_path}")
+    return manifest
+
+# ─── Main CLI ──────────────────────────────────────────────
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack icons/ into per-size sprite atlases.")
+    parser.add_argument("--root", default=ICONS_ROOT)
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--icon-ids", help="JSON {iconID: iconFile} to map iconIDs to tiles")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--force", action="store_true", help="rehash and repack everything")
+    args = parser.parse_args(argv)
+
+    icon_ids = None
+    if args.icon_ids:
+        with open(args.icon_ids, "r", encoding="utf-8") as f:
+            icon_ids = json.load(f)
+    try:
+        build_icon_atlases(icon_ids, args.root, args.out_dir, args.jobs, args.force)
+    except RuntimeError as e:
+        print(f"⚠️ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+import os
+import io
+import sys
+import gzip
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ─── Output Loading ───────────────────────────────────────
+
+# Same names and compression suffixes sdeDataExtractor.py writes
+OUTPUT_EXTENSIONS = ("", ".gz", ".zst")
+PLEX_REGION_ID = 19000001
+
+
+def load_output(directory, filename, ext=None):
+    """Load an extractor output.
+
+    ext is the compression suffix it was written with ("", ".gz" or
+    ".zst"). Left out, the one copy on disk is read; when several exist a
+    stale one may be among them, so that is an error.
+    """
+    if ext is None:
+        found = [e for e in OUTPUT_EXTENSIONS if os.path.exists(os.path.join(directory, filename + e))]
+        if len(found) > 1:
+            raise FileExistsError(f"{' and '.join(filename + e for e in found)} both exist in {directory}; "
+                                  f"remove the stale one")
+        ext = found[0] if found else ""
+    path = os.path.join(directory, filename + ext)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{filename + ext} not found in {directory}")
+    if ext == ".gz":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    if ext == ".zst":
+        import zstandard
+        with open(path, "rb") as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw)
+            return json.load(io.TextIOWrapper(reader, encoding="utf-8"))
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _is_group(node):
+    return isinstance(node, dict) and "_info" in node
+
+# ─── Index ─────────────────────────────────────────────────
+
+
+class SDEIndex:
+    """O(1) lookups over market.json, locations.json and ores.json.
+
+    Each output is read and indexed the first time one of its lookups is
+    used, so a tool that only resolves stations never parses market.json.
+    """
+
+    def __init__(self, directory=".", ext=None):
+        self.directory = directory
+        self.ext = ext
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _index(self, name, build):
+        if name not in self._indexes:
+            with self._lock:
+                if name not in self._indexes:
+                    self._indexes[name] = build()
+        return self._indexes[name]
+
+    # ── market.json ──
+
+    def _build_market(self):
+        """typeID -> type record and marketGroupID -> group with descendant typeIDs"""
+        market = load_output(self.directory, "market.json", self.ext)
+        types = {}
+        groups = {}
+
+        # Iterative walk; (name, node, path, parentID)
+        stack = [(name, node, [], None) for name, node in reversed(list(market.items()))
+                 if _is_group(node)]
+        order = []
+        while stack:
+            name, node, parents, parent_id = stack.pop()
+            info = node["_info"]
+            mgid = int(info["marketGroupID"])
+            path = parents + [name]
+            group = {
+                "marketGroupID": mgid,
+                "name": name,
+                "path": path,
+                "parentGroupID": parent_id,
+                "iconID": info.get("iconID"),
+                "iconFile": info.get("iconFile"),
+                "hasTypes": info.get("hasTypes") == "True",
+                "childGroupIDs": [],
+                "typeIDs": [],
+            }
+            groups[mgid] = group
+            order.append(mgid)
+            if parent_id is not None:
+                groups[parent_id]["childGroupIDs"].append(mgid)
+            for item in node.get("items", []):
+                type_id = int(item["typeID"])
+                types[type_id] = dict(item, marketGroupID=mgid, path=path)
+                group["typeIDs"].append(type_id)
+            children = [(child_name, child, path, mgid) for child_name, child in node.items()
+                        if child_name != "_info" and _is_group(child)]
+            stack.extend(reversed(children))
+
+        # Fold descendant types upwards, deepest groups first
+        for mgid in reversed(order):
+            group = groups[mgid]
+            group["descendantTypeIDs"] = list(group["typeIDs"])
+            for child_id in group["childGroupIDs"]:
+                group["descendantTypeIDs"].extend(groups[child_id]["descendantTypeIDs"])
+        return {"types": types, "groups": groups}
+
+    def type(self, type_id):
+        return self._index("market", self._build_market)["types"].get(int(type_id))
+
+    def market_group(self, market_group_id):
+        return self._index("market", self._build_market)["groups"].get(int(market_group_id))
+
+    def types(self):
+        """Every type record, keyed by typeID"""
+        return self._index("market", self._build_market)["types"]
+
+    def market_groups(self):
+        return self._index("market", self._build_market)["groups"]
+
+    def market_group_type_ids(self, market_group_id):
+        """Every typeID in the group or any of its descendants"""
+        group = self.market_group(market_group_id)
+        return group["descendantTypeIDs"] if group else []
+
+    # ── locations.json ──
+
+    def _build_locations(self):
+        """stationID -> station with its hierarchy and systemID -> path"""
+        locations = load_output(self.directory, "locations.json", self.ext)
+        stations = {}
+        systems = {}
+        regions = {}
+        for region_name, region in locations.items():
+            if not isinstance(region, dict) or "regionID" not in region:
+                continue
+            regions[region["regionID"]] = region_name
+            for const_name, const in region.items():
+                if not isinstance(const, dict) or "constellationID" not in const:
+                    continue
+                for system_name, system in const.items():
+                    if not isinstance(system, dict) or "solarSystemID" not in system:
+                        continue
+                    path = {
+                        "region": region_name,
+                        "regionID": region["regionID"],
+                        "constellation": const_name,
+                        "constellationID": const["constellationID"],
+                        "system": system_name,
+                        "solarSystemID": system["solarSystemID"],
+                        "solarSystemNameID": system.get("solarSystemNameID"),
+                        "security": system.get("security"),
+                    }
+                    systems[system["solarSystemID"]] = path
+                    for station_id, station in system.get("stations", {}).items():
+                        stations[int(station_id)] = dict(station, location=path)
+        return {"stations": stations, "systems": systems, "regions": regions}
+
+    def station(self, station_id):
+        return self._index("locations", self._build_locations)["stations"].get(int(station_id))
+
+    def system(self, system_id):
+        return self._index("locations", self._build_locations)["systems"].get(int(system_id))
+
+    def stations(self):
+        """Every station, keyed by stationID, with its location path"""
+        return self._index("locations", self._build_locations)["stations"]
+
+    def systems(self):
+        return self._index("locations", self._build_locations)["systems"]
+
+    def plex_location(self):
+        """First system of the PLEX region, in locations.json order"""
+        systems = self._index("locations", self._build_locations)["systems"]
+        return next((path for path in systems.values()
+                     if path["regionID"] == PLEX_REGION_ID), None)
+
+    # ── ores.json ──
+
+    def _build_resources(self):
+        """typeID -> ore/mineral entry from ores.json"""
+        resources = {}
+        data = load_output(self.directory, "ores.json", self.ext)
+        for category in ("ores", "minerals"):
+            for entry in data.get(category, []):
+                resources[entry["typeID"]] = dict(entry, category=category)
+        return resources
+
+    def resource(self, type_id):
+        return self._index("resources", self._build_resources).get(int(type_id))
+
+# ─── Query CLI & HTTP ─────────────────────────────────────
+
+QUERIES = {
+    "type": SDEIndex.type,
+    "group": SDEIndex.market_group,
+    "group-types": SDEIndex.market_group_type_ids,
+    "station": SDEIndex.station,
+    "system": SDEIndex.system,
+    "resource": SDEIndex.resource,
+}
+
+
+def run_query(index, kind, key=None):
+    if kind == "plex":
+        return index.plex_location()
+    return QUERIES[kind](index, key)
+
+
+def make_handler(index):
+    class QueryHandler(BaseHTTPRequestHandler):
+        """GET /<kind>/<id> (e.g. /type/34, /station/60003760, /plex) -> JSON"""
+
+        def do_GET(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            try:
+                if parts == ["plex"]:
+                    result = run_query(index, "plex")
+                elif len(parts) == 2 and parts[0] in QUERIES:
+                    result = run_query(index, parts[0], parts[1])
+                else:
+                    return self._send(404, {"error": f"unknown query {self.path}"})
+            except ValueError:
+                return self._send(400, {"error": f"bad id in {self.path}"})
+            except (FileNotFoundError, FileExistsError) as e:
+                return self._send(503, {"error": str(e)})
+            if result is None:
+                return self._send(404, {"error": "not found"})
+            self._send(200, result)
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Look up records in the extractor outputs.")
+    parser.add_argument("--dir", default=".", help="directory holding market.json, locations.json, ores.json")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for kind in QUERIES:
+        sub.add_parser(kind).add_argument("id")
+    sub.add_parser("plex")
+    serve = sub.add_parser("serve", help="answer GET /<kind>/<id> over HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    index = SDEIndex(args.dir)
+
+    if args.command == "serve":
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+        print(f"🌐 Serving queries on http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        result = run_query(index, args.command, getattr(args, "id", None))
+    except ValueError:
+        print(f"⚠️ Bad id: {getattr(args, 'id', None)}")
+        return 1
+    if result is None:
+        print("⚠️ Not found")
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import sys
+
+# ─── Type Records ──────────────────────────────────────────
+
+
+class TypeRecord:
+    """The types.yaml fields the extractors read; missing fields are None"""
+
+    __slots__ = ("type_id", "group_id", "market_group_id", "icon_id",
+                 "volume", "mass", "published", "name")
+
+    def __init__(self, type_id, group_id, market_group_id, icon_id, volume, mass, published, name):
+        self.type_id = type_id
+        self.group_id = group_id
+        self.market_group_id = market_group_id
+        self.icon_id = icon_id
+        self.volume = volume
+        self.mass = mass
+        self.published = published
+        self.name = name
+
+    def __reduce__(self):
+        # Positional args pickle far smaller than a per-object slot dict
+        return TypeRecord, tuple(getattr(self, slot) for slot in self.__slots__)
+
+    @classmethod
+    def from_yaml(cls, type_id, tdata):
+        name = tdata.get("name", {}).get("en")
+        return cls(int(type_id), tdata.get("groupID"), tdata.get("marketGroupID"),
+                   tdata.get("iconID"), tdata.get("volume"), tdata.get("mass"),
+                   tdata.get("published", False),
+                   sys.intern(name) if name is not None else None)
@@ -0,0 +1,109 @@
+import sys
+import json
+import argparse
+import numpy as np
+
+# ─── Refine Matrix ─────────────────────────────────────────
+REFINE_MATRIX_PATH = "refine_matrix.npz"
+
+
+class RefineMatrix:
+    """Sparse ore x material yield matrix in CSR form.
+
+    Row r holds what one reprocessing batch of row_type_ids[r] yields:
+    columns indices[indptr[r]:indptr[r + 1]] (positions in col_type_ids)
+    with quantities data[indptr[r]:indptr[r + 1]].
+    """
+
+    def __init__(self, indptr, indices, data, row_type_ids, col_type_ids):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.row_type_ids = np.asarray(row_type_ids, dtype=np.int64)
+        self.col_type_ids = np.asarray(col_type_ids, dtype=np.int64)
+        self.row_index = {int(t): i for i, t in enumerate(self.row_type_ids)}
+        self.col_index = {int(t): i for i, t in enumerate(self.col_type_ids)}
+
+    @property
+    def shape(self):
+        return len(self.row_type_ids), len(self.col_type_ids)
+
+    def price_vector(self, prices, default=0.0):
+        """Align a {typeID: price} mapping with col_type_ids"""
+        return np.array([prices.get(int(t), default) for t in self.col_type_ids], dtype=np.float64)
+
+    def refine_values(self, prices, efficiency=1.0):
+        """Value of one batch of every row for one or many price vectors.
+
+        prices has shape (..., n_materials), aligned with col_type_ids (a
+        {typeID: price} dict is aligned for you). efficiency is a scalar or
+        per-row array of shape (n_rows,) or (..., n_rows) and scales the
+        yield. Returns an array of shape (..., n_rows).
+        """
+        if isinstance(prices, dict):
+            prices = self.price_vector(prices)
+        prices = np.asarray(prices, dtype=np.float64)
+        # Per-nonzero contribution, then segment sums per row via a running total,
+        # which also handles rows with no materials
+        contributions = prices[..., self.indices] * self.data
+        running = np.cumsum(contributions, axis=-1)
+        running = np.concatenate([np.zeros(running.shape[:-1] + (1,)), running], axis=-1)
+        values = running[..., self.indptr[1:]] - running[..., self.indptr[:-1]]
+        return values * np.asarray(efficiency, dtype=np.float64)
+
+    def yields(self, type_id):
+        """{materialTypeID: quantity} for one row"""
+        r = self.row_index[int(type_id)]
+        start, end = self.indptr[r], self.indptr[r + 1]
+        return {int(self.col_type_ids[c]): float(q)
+                for c, q in zip(self.indices[start:end], self.data[start:end])}
+
+    def save(self, path=REFINE_MATRIX_PATH):
+        np.savez_compressed(path, indptr=self.indptr, indices=self.indices, data=self.data,
+                            row_type_ids=self.row_type_ids, col_type_ids=self.col_type_ids)
+
+
+def build_refine_matrix(entries):
+    """Build a RefineMatrix from extractor entries ({"typeID", "refined_output": [...]})"""
+    rows = sorted({entry["typeID"]: entry["refined_output"] for entry in entries}.items())
+    col_type_ids = sorted({m["typeID"] for _, refined in rows for m in refined})
+    col_index = {t: i for i, t in enumerate(col_type_ids)}
+
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indices, data = [], []
+    for r, (_, refined) in enumerate(rows):
+        for material in sorted(refined, key=lambda m: col_index[m["typeID"]]):
+            indices.append(col_index[material["typeID"]])
+            data.append(material["quantity"])
+        indptr[r + 1] = len(indices)
+    return RefineMatrix(indptr, indices, data, [t for t, _ in rows], col_type_ids)
+
+
+def load_refine_matrix(path=REFINE_MATRIX_PATH):
+    with np.load(path) as f:
+        return RefineMatrix(f["indptr"], f["indices"], f["data"],
+                            f["row_type_ids"], f["col_type_ids"])
+
+# ─── Main CLI ──────────────────────────────────────────────
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Value every ore/ice/moon ore batch from a {typeID: price} JSON file.")
+    parser.add_argument("prices", help="JSON object mapping material typeID to price")
+    parser.add_argument("--matrix", default=REFINE_MATRIX_PATH)
+    parser.add_argument("--efficiency", type=float, default=1.0, help="refining yield, e.g. 0.8")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    matrix = load_refine_matrix(args.matrix)
+    with open(args.prices, "r", encoding="utf-8") as f:
+        prices = {int(k): float(v) for k, v in json.load(f).items()}
+    values = matrix.refine_values(prices, args.efficiency)
+    for r in np.argsort(-values)[:args.top]:
+        print(f"{int(matrix.row_type_ids[r]):>10}  {values[r]:>16,.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
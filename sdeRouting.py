@@ -0,0 +1,238 @@
+import sys
+import json
+import hashlib
+import argparse
+from collections import deque
+
+from sdeQuery import load_output
+
+try:
+    import numpy as np
+except ImportError:  # BFS routing works without it; jump tables need it
+    np = None
+
+# ─── Jump Graph ────────────────────────────────────────────
+JUMP_GRAPH_FILE = "jump_graph.json"
+JUMP_TABLE_PATH = "jump_table.npy"
+HIGHSEC_MIN_SECURITY = 0.45  # Displayed security rounds to one decimal, so 0.45 shows as 0.5
+
+
+class JumpGraph:
+    """Stargate adjacency from jump_graph.json (CSR over sorted systemIDs).
+
+    Queries take and return solarSystemIDs. min_security restricts routes
+    to systems at or above that security; the origin is always allowed.
+    """
+
+    def __init__(self, system_ids, indptr, indices, security=None, names=None):
+        self.system_ids = list(system_ids)
+        self.indptr = list(indptr)
+        self.indices = list(indices)
+        self.security = list(security) if security is not None else [None] * len(self.system_ids)
+        self.names = list(names) if names is not None else [None] * len(self.system_ids)
+        self.position = {sid: i for i, sid in enumerate(self.system_ids)}
+        self._by_name = {name.lower(): sid for sid, name in zip(self.system_ids, self.names) if name}
+
+    @classmethod
+    def from_json(cls, graph):
+        return cls(graph["systemIDs"], graph["indptr"], graph["indices"],
+                   graph.get("security"), graph.get("names"))
+
+    def __len__(self):
+        return len(self.system_ids)
+
+    def resolve(self, system):
+        """solarSystemID for an ID or (case-insensitive) system name; None if unknown"""
+        try:
+            system_id = int(system)
+        except (TypeError, ValueError):
+            return self._by_name.get(str(system).lower())
+        return system_id if system_id in self.position else None
+
+    def neighbors(self, system_id):
+        i = self.position[system_id]
+        return [self.system_ids[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def digest(self):
+        """Identifies this graph; jump tables record it so a stale table is refused"""
+        payload = json.dumps([self.system_ids, self.indptr, self.indices]).encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _allowed(self, min_security):
+        if min_security is None:
+            return None
+        return [sec is not None and sec >= min_security for sec in self.security]
+
+    def _bfs(self, source, target=None, min_security=None):
+        # Returns (distance, parent) over positions; stops early once target is reached
+        allowed = self._allowed(min_security)
+        indptr, indices = self.indptr, self.indices
+        distance = [-1] * len(self.system_ids)
+        parent = [-1] * len(self.system_ids)
+        distance[source] = 0
+        queue = deque([source])
+        while queue:
+            i = queue.popleft()
+            if i == target:
+                break
+            next_distance = distance[i] + 1
+            for j in indices[indptr[i]:indptr[i + 1]]:
+                if distance[j] < 0 and (allowed is None or allowed[j]):
+                    distance[j] = next_distance
+                    parent[j] = i
+                    queue.append(j)
+        return distance, parent
+
+    def distances(self, origin, min_security=None):
+        """{solarSystemID: jumps} for every system reachable from origin"""
+        distance, _ = self._bfs(self.position[origin], min_security=min_security)
+        return {self.system_ids[i]: d for i, d in enumerate(distance) if d >= 0}
+
+    def route(self, origin, destination, min_security=None):
+        """Shortest route as a list of solarSystemIDs (origin first); None if unreachable"""
+        source, target = self.position[origin], self.position[destination]
+        distance, parent = self._bfs(source, target, min_security)
+        if distance[target] < 0:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(parent[path[-1]])
+        return [self.system_ids[i] for i in reversed(path)]
+
+    def jumps(self, origin, destination, min_security=None):
+        path = self.route(origin, destination, min_security)
+        return len(path) - 1 if path is not None else None
+
+    def highsec_route(self, origin, destination):
+        return self.route(origin, destination, HIGHSEC_MIN_SECURITY)
+
+
+def load_jump_graph(directory="."):
+    return JumpGraph.from_json(load_output(directory, JUMP_GRAPH_FILE))
+
+# ─── All-Pairs Jump Table ─────────────────────────────────
+
+
+def build_jump_table(graph, min_security=None, batch=256):
+    """Jump counts between every pair of systems as an (n, n) uint8/uint16 array.
+
+    Row/column order follows graph.system_ids; unreachable pairs hold the
+    dtype's maximum. Sources are expanded a batch at a time with one
+    frontier matrix per level, so no per-system Python BFS is needed.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for jump tables")
+    n = len(graph)
+    indptr = np.asarray(graph.indptr, dtype=np.int64)
+    src = np.repeat(np.arange(n), np.diff(indptr))
+    dst = np.asarray(graph.indices, dtype=np.int64)
+
+    allowed = graph._allowed(min_security)
+    if allowed is not None:
+        # Edges into filtered systems are dropped; they can still be origins
+        keep = np.asarray(allowed, dtype=bool)[dst]
+        src, dst = src[keep], dst[keep]
+
+    # Group edges by destination so one reduceat ORs all predecessors of each system
+    order = np.argsort(dst, kind="stable")
+    src, dst = src[order], dst[order]
+    targets, starts = np.unique(dst, return_index=True)
+
+    unreachable = np.iinfo(np.uint16).max
+    table = np.full((n, n), unreachable, dtype=np.uint16)
+    for first in range(0, n, batch):
+        rows = np.arange(first, min(n, first + batch))
+        block = table[first:first + len(rows)]
+        visited = np.zeros((len(rows), n), dtype=bool)
+        visited[np.arange(len(rows)), rows] = True
+        block[np.arange(len(rows)), rows] = 0
+        frontier = visited.copy()
+        level = 0
+        while frontier.any() and len(src):
+            level += 1
+            reached = np.zeros_like(frontier)
+            reached[:, targets] = np.logical_or.reduceat(frontier[:, src], starts, axis=1)
+            frontier = reached & ~visited
+            visited |= frontier
+            block[frontier] = level
+
+    reachable = table[table != unreachable]
+    if not reachable.size or reachable.max() < np.iinfo(np.uint8).max:
+        small = table.astype(np.uint8)
+        small[table == unreachable] = np.iinfo(np.uint8).max
+        return small
+    return table
+
+
+def save_jump_table(graph, table, path=JUMP_TABLE_PATH, min_security=None):
+    """Write table as .npy (memory-mappable) with a .json sidecar naming its graph"""
+    np.save(path, table)
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump({"graph": graph.digest(), "minSecurity": min_security,
+                   "dtype": str(table.dtype)}, f, indent=2)
+
+
+class JumpTable:
+    """O(1) jump counts from a precomputed table, memory-mapped rather than loaded"""
+
+    def __init__(self, graph, path=JUMP_TABLE_PATH):
+        if np is None:
+            raise RuntimeError("numpy is required for jump tables")
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["graph"] != graph.digest():
+            raise ValueError(f"{path} was built for a different jump graph; rebuild it")
+        self.graph = graph
+        self.min_security = meta["minSecurity"]
+        self.table = np.load(path, mmap_mode="r")
+        self.unreachable = np.iinfo(self.table.dtype).max
+
+    def jumps(self, origin, destination):
+        value = int(self.table[self.graph.position[origin], self.graph.position[destination]])
+        return None if value == self.unreachable else value
+
+# ─── Main CLI ──────────────────────────────────────────────
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stargate routes over jump_graph.json.")
+    parser.add_argument("--dir", default=".", help="directory holding jump_graph.json")
+    parser.add_argument("--highsec", action="store_true",
+                        help=f"only route through systems with security >= {HIGHSEC_MIN_SECURITY}")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command in ("route", "jumps"):
+        p = sub.add_parser(command)
+        p.add_argument("origin", help="solarSystemID or system name")
+        p.add_argument("destination")
+    table = sub.add_parser("build-table", help="precompute the all-pairs jump table (needs numpy)")
+    table.add_argument("--out", default=JUMP_TABLE_PATH)
+    args = parser.parse_args(argv)
+
+    graph = load_jump_graph(args.dir)
+    min_security = HIGHSEC_MIN_SECURITY if args.highsec else None
+
+    if args.command == "build-table":
+        table = build_jump_table(graph, min_security)
+        save_jump_table(graph, table, args.out, min_security)
+        print(f"💾 Exported: {args.out} ({len(graph)}x{len(graph)} {table.dtype})")
+        return 0
+
+    origin, destination = graph.resolve(args.origin), graph.resolve(args.destination)
+    if origin is None or destination is None:
+        print("⚠️ Unknown system")
+        return 1
+    path = graph.route(origin, destination, min_security)
+    if path is None:
+        print("⚠️ No route")
+        return 1
+    if args.command == "jumps":
+        print(len(path) - 1)
+    else:
+        for system_id in path:
+            i = graph.position[system_id]
+            print(f"{system_id:>10}  {graph.security[i]!s:>8}  {graph.names[i]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
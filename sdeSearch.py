@@ -0,0 +1,385 @@
+import os
+import re
+import sys
+import json
+import math
+import heapq
+import argparse
+import itertools
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+
+from sdeQuery import SDEIndex
+
+# ─── Normalization ─────────────────────────────────────────
+SEARCH_INDEX_PATH = "search_index.json"
+SEARCH_INDEX_VERSION = 1
+KINDS = ("type", "system", "station")
+RUN_SORT_MAX = 4096  # Longer prefix runs are found by a best-first scan instead of a sort
+FUZZY_MIN_OVERLAP = 0.4  # Share of a query word's trigrams a close spelling must contain
+FUZZY_WORD_ALTERNATIVES = 8  # Close spellings tried per query word
+FUZZY_MAX_CANDIDATES = 256  # Names scored per multi-word fuzzy query, shortest first
+INTERSECT_CHECK_MAX = 64  # Multi-word candidates checked name by name instead of intersecting further
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text):
+    """Lowercase, accents stripped, runs of punctuation/space as one space"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def trigrams(normalized):
+    """Distinct trigrams of a normalized name, padded so word edges count"""
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# ─── Index Build ───────────────────────────────────────────
+
+
+def collect_names(directory=".", ext=None):
+    """(kind, id, name) for every type in market.json and system/station in locations.json"""
+    index = SDEIndex(directory, ext)
+    entries = []
+    try:
+        entries.extend(("type", type_id, t["typeName"])
+                       for type_id, t in sorted(index.types().items()))
+    except FileNotFoundError as e:
+        print(f"⚠️ Skipping type names: {e}")
+    try:
+        entries.extend(("system", system_id, path["system"])
+                       for system_id, path in sorted(index.systems().items()))
+        entries.extend(("station", station_id, station.get("stationName"))
+                       for station_id, station in sorted(index.stations().items()))
+    except FileNotFoundError as e:
+        print(f"⚠️ Skipping system and station names: {e}")
+    return [entry for entry in entries if entry[2]]
+
+
+def build_search_index(entries):
+    """Search index over (kind, id, name) entries, as a JSON-ready dict.
+
+    Entries are addressed by position, shortest normalized name first.
+    byName orders them by normalized name (exact and whole-name prefix
+    matches). vocabulary is the sorted
+    list of distinct words; the entries containing vocabulary[w] are
+    wordEntries[wordStarts[w]:wordStarts[w + 1]], so every word with a
+    given prefix is one contiguous slice. trigrams maps each trigram to
+    the vocabulary words containing it (fuzzy matches).
+    """
+    # Shortest names first, so every postings run lists its best matches first
+    keyed = sorted(((normalize(name), KINDS.index(kind), entry_id, name)
+                    for kind, entry_id, name in entries),
+                   key=lambda entry: (len(entry[0]), entry[0], entry[1], entry[2]))
+    entries = [(KINDS[kind], entry_id, name) for _, kind, entry_id, name in keyed]
+    normalized = [norm for norm, _, _, _ in keyed]
+    by_word = defaultdict(list)
+    for i, norm in enumerate(normalized):
+        for word in set(norm.split()):
+            by_word[word].append(i)
+    vocabulary = sorted(by_word)
+    word_starts, word_entries = [0], []
+    postings = defaultdict(list)
+    for w, word in enumerate(vocabulary):
+        word_entries.extend(by_word[word])
+        word_starts.append(len(word_entries))
+        for gram in trigrams(word):
+            postings[gram].append(w)
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "kinds": list(KINDS),
+        "kind": [KINDS.index(kind) for kind, _, _ in entries],
+        "ids": [entry_id for _, entry_id, _ in entries],
+        "names": [name for _, _, name in entries],
+        "normalized": normalized,
+        "byName": sorted(range(len(entries)), key=lambda i: (normalized[i], i)),
+        "vocabulary": vocabulary,
+        "wordStarts": word_starts,
+        "wordEntries": word_entries,
+        "trigrams": dict(sorted(postings.items())),
+    }
+
+
+def export_search_index(directory=".", path=SEARCH_INDEX_PATH, ext=None):
+    """Write the search index for the extractor outputs in directory.
+
+    ext is the compression suffix they were written with (see load_output).
+    """
+    print(f"\n🔎 Building search index {path}...")
+    index = build_search_index(collect_names(directory, ext))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    counts = defaultdict(int)
+    for kind in index["kind"]:
+        counts[KINDS[kind]] += 1
+    for kind in KINDS:
+        print(f"   {kind + 's':<10} {counts[kind]:>8} names")
+    print(f"💾 Exported: {path}")
+    return index
+
+# ─── Queries ───────────────────────────────────────────────
+
+
+class _Postings:
+    """An index's lookup lists restricted to some kinds.
+
+    order holds the entries best first; the others mirror SearchIndex's
+    lists of the same names.
+    """
+    __slots__ = ("order", "by_name", "sorted_names", "word_starts", "word_entries")
+
+    def __init__(self, order, by_name, sorted_names, word_starts, word_entries):
+        self.order = order
+        self.by_name = by_name
+        self.sorted_names = sorted_names
+        self.word_starts = word_starts
+        self.word_entries = word_entries
+
+
+class SearchIndex:
+    """Type-ahead search over a built index.
+
+    search() ranks exact name matches first, then names starting with the
+    query, then names in which every query word starts a word, then fuzzy
+    matches, where each query word may instead be a close spelling of a
+    word in the name. Within a tier shorter names come first; tiers after
+    the first full one are not computed.
+    """
+
+    def __init__(self, data):
+        if data.get("version") != SEARCH_INDEX_VERSION:
+            raise ValueError("search index was built by another version; rebuild it")
+        self.kinds = data["kinds"]
+        self.kind = data["kind"]
+        self.ids = data["ids"]
+        self.names = data["names"]
+        self.normalized = data["normalized"]
+        self.by_name = data["byName"]
+        self.sorted_names = [self.normalized[i] for i in self.by_name]
+        self.vocabulary = data["vocabulary"]
+        self.word_starts = data["wordStarts"]
+        self.word_entries = data["wordEntries"]
+        self.trigrams = data["trigrams"]
+        self._postings = {None: _Postings(range(len(self.ids)), self.by_name, self.sorted_names,
+                                          self.word_starts, self.word_entries)}
+
+    @classmethod
+    def load(cls, path=SEARCH_INDEX_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _result(self, i, match, score):
+        return {"kind": self.kinds[self.kind[i]], "id": self.ids[i], "name": self.names[i],
+                "match": match, "score": round(score, 3)}
+
+    def _postings_for(self, kinds):
+        """Postings holding only the given kinds, filtered on first use.
+
+        A query limited to a rare kind then never walks the matches of
+        the others.
+        """
+        key = None if kinds is None else frozenset(self.kinds.index(kind) for kind in kinds)
+        if key is not None and len(key) == len(self.kinds):
+            key = None
+        postings = self._postings.get(key)
+        if postings is None:
+            kind = self.kind
+            by_name = [i for i in self.by_name if kind[i] in key]
+            starts, entries = [0], []
+            for w in range(len(self.vocabulary)):
+                entries.extend(i for i in self.word_entries[self.word_starts[w]:self.word_starts[w + 1]]
+                               if kind[i] in key)
+                starts.append(len(entries))
+            postings = self._postings[key] = _Postings(
+                [i for i in range(len(self.ids)) if kind[i] in key], by_name,
+                [self.normalized[i] for i in by_name], starts, entries)
+        return postings
+
+    def _word_range(self, word):
+        """(lo, hi) of the vocabulary words starting with word"""
+        lo = bisect_left(self.vocabulary, word)
+        return lo, bisect_right(self.vocabulary, word + "\U0010ffff", lo)
+
+    def _best_first(self, postings, run, lo, hi, matches):
+        """Entries in run[lo:hi] (repeats allowed) in rank order.
+
+        A short run is sorted. A long one means matches are common, so
+        scanning the entries best first reaches the next match quickly and
+        callers stop after limit of them.
+        """
+        if hi - lo <= RUN_SORT_MAX:
+            return sorted(set(run[lo:hi]))
+        return (i for i in postings.order if matches(i))
+
+    def _intersect(self, postings, runs, matches):
+        """Entries present in every word's runs, best first.
+
+        runs holds one list of (start, end) wordEntries slices per word;
+        the smallest word is intersected first. Once at most
+        INTERSECT_CHECK_MAX candidates are left, matches(i) checks them
+        instead of the remaining runs. Entry numbers are ranks, so sorting
+        the survivors orders them.
+        """
+        entries = postings.word_entries
+        runs = sorted(runs, key=lambda run: sum(end - start for start, end in run))
+        candidates = set(itertools.chain.from_iterable(entries[start:end] for start, end in runs[0]))
+        for run in runs[1:]:
+            if len(candidates) <= INTERSECT_CHECK_MAX:
+                return sorted(i for i in candidates if matches(i))
+            candidates.intersection_update(
+                itertools.chain.from_iterable(entries[start:end] for start, end in run))
+        return sorted(candidates)
+
+    def prefix(self, query, limit=10, kinds=None, _seen=None):
+        """Exact and prefix matches, in that order"""
+        q = normalize(query)
+        if not q:
+            return []
+        postings = self._postings_for(kinds)
+        seen = set() if _seen is None else _seen
+        results = []
+
+        def add(i, match, score):
+            seen.add(i)
+            results.append(self._result(i, match, score))
+            return len(results) >= limit
+
+        # Whole-name matches are one contiguous run of the sorted names.
+        # Taken best first, the exact ones (the shortest) lead.
+        lo = bisect_left(postings.sorted_names, q)
+        hi = bisect_right(postings.sorted_names, q + "\U0010ffff", lo)
+        for i in self._best_first(postings, postings.by_name, lo, hi,
+                                  lambda i: self.normalized[i].startswith(q)):
+            if i not in seen:
+                name = self.normalized[i]
+                if add(i, "exact" if name == q else "prefix", len(q) / len(name)):
+                    return results
+
+        # Then names where every query word starts one of their words
+        words = q.split()
+        ranges = [self._word_range(w) for w in words]
+        starts = postings.word_starts
+
+        def matches(i):
+            tokens = self.normalized[i].split()
+            return all(any(t.startswith(w) for t in tokens) for w in words)
+
+        if len(words) == 1:
+            found = self._best_first(postings, postings.word_entries,
+                                     starts[ranges[0][0]], starts[ranges[0][1]], matches)
+        else:
+            found = self._intersect(postings, [[(starts[lo], starts[hi])] for lo, hi in ranges], matches)
+        for i in found:
+            if i not in seen and add(i, "prefix", len(q) / len(self.normalized[i])):
+                break
+        return results
+
+    def similar_words(self, word, limit=FUZZY_WORD_ALTERNATIVES):
+        """[(score, vocabulary index)] of words sharing FUZZY_MIN_OVERLAP of word's trigrams, best first"""
+        grams = trigrams(word)
+        need = max(1, math.ceil(FUZZY_MIN_OVERLAP * len(grams)))
+        counts = Counter(itertools.chain.from_iterable(self.trigrams.get(g, ()) for g in grams))
+        # Jaccard over trigram windows; a word has one per character
+        scored = [(shared / (len(grams) + len(self.vocabulary[w]) - shared), w)
+                  for w, shared in counts.items() if shared >= need]
+        return heapq.nlargest(limit, scored)
+
+    def fuzzy(self, query, limit=10, kinds=None, _seen=()):
+        """Names matching every query word by prefix or close spelling, most similar first"""
+        words = normalize(query).split()
+        if not words:
+            return []
+        postings = self._postings_for(kinds)
+        starts, entries = postings.word_starts, postings.word_entries
+        similar = [self.similar_words(word) if len(word) >= 3 else [] for word in words]
+
+        if len(words) == 1:
+            # A name scores as its closest word, so runs are taken best spelling first
+            seen = set(_seen)
+            results = []
+            for score, w in similar[0]:
+                for i in entries[starts[w]:starts[w + 1]]:
+                    if i not in seen:
+                        seen.add(i)
+                        results.append(self._result(i, "fuzzy", score))
+                        if len(results) >= limit:
+                            return results
+            return results
+
+        # Several words: names holding each word's prefix or one of its close
+        # spellings, best first; each word's best match in the name is averaged
+        runs = []
+        for word, alternatives in zip(words, similar):
+            lo, hi = self._word_range(word)
+            runs.append([(starts[lo], starts[hi])] + [(starts[w], starts[w + 1]) for _, w in alternatives])
+        spellings = [{self.vocabulary[w]: score for score, w in alternatives} for alternatives in similar]
+
+        def word_scores(i):
+            tokens = self.normalized[i].split()
+            return [max(1.0 if t.startswith(word) else spelling.get(t, 0.0) for t in tokens)
+                    for word, spelling in zip(words, spellings)]
+
+        scored = []
+        examined = 0
+        for i in self._intersect(postings, runs, lambda i: all(word_scores(i))):
+            if i in _seen:
+                continue
+            examined += 1
+            if examined > FUZZY_MAX_CANDIDATES:
+                break
+            scored.append((-sum(word_scores(i)) / len(words), i))
+        return [self._result(i, "fuzzy", -score) for score, i in heapq.nsmallest(limit, scored)]
+
+    def search(self, query, limit=10, kinds=None):
+        """Up to limit results ranked exact, prefix, then fuzzy.
+
+        Within a tier, results are best first. Scores only compare results
+        of the same tier; a fuzzy score can be higher than a prefix one.
+        """
+        seen = set()
+        results = self.prefix(query, limit, kinds, seen)
+        if len(results) < limit:
+            results.extend(self.fuzzy(query, limit - len(results), kinds, seen))
+        return results
+
+
+def load_search_index(path=SEARCH_INDEX_PATH):
+    return SearchIndex.load(path)
+
+# ─── Main CLI ──────────────────────────────────────────────
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Name search over types, systems and stations.")
+    parser.add_argument("--index", default=SEARCH_INDEX_PATH, help="search index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the index from market.json and locations.json")
+    build.add_argument("--dir", default=".", help="directory holding the extractor outputs")
+    query = sub.add_parser("query")
+    query.add_argument("text", nargs="+")
+    query.add_argument("-n", "--limit", type=int, default=10)
+    query.add_argument("--kind", action="append", choices=KINDS, help="only these kinds (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        export_search_index(args.dir, args.index)
+        return 0
+
+    results = load_search_index(args.index).search(" ".join(args.text), args.limit, args.kind)
+    if not results:
+        print("⚠️ No matches")
+        return 1
+    for r in results:
+        print(f"{r['match']:<6} {r['score']:5.2f}  {r['kind']:<8} {r['id']:>10}  {r['name']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+
+from sdeQuery import SDEIndex, load_output
+
+# ─── Schema ────────────────────────────────────────────────
+SQLITE_PATH = "sde.sqlite"
+
+SCHEMA = """
+CREATE TABLE market_groups (
+    market_group_id INTEGER PRIMARY KEY,
+    parent_group_id INTEGER,
+    name TEXT NOT NULL,
+    icon_id INTEGER,
+    icon_file TEXT,
+    has_types INTEGER NOT NULL
+);
+CREATE TABLE types (
+    type_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    market_group_id INTEGER NOT NULL,
+    icon_id INTEGER,
+    icon_file TEXT,
+    volume REAL,
+    mass REAL,
+    published INTEGER NOT NULL
+);
+CREATE TABLE regions (
+    region_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE constellations (
+    constellation_id INTEGER PRIMARY KEY,
+    region_id INTEGER NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE systems (
+    solar_system_id INTEGER PRIMARY KEY,
+    constellation_id INTEGER NOT NULL,
+    region_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_id INTEGER,
+    security REAL
+);
+CREATE TABLE stations (
+    station_id INTEGER PRIMARY KEY,
+    solar_system_id INTEGER NOT NULL,
+    constellation_id INTEGER NOT NULL,
+    region_id INTEGER NOT NULL,
+    name TEXT,
+    station_type_id INTEGER,
+    corporation_id INTEGER,
+    security REAL,
+    reprocessing_efficiency REAL,
+    reprocessing_stations_take REAL,
+    x REAL,
+    y REAL,
+    z REAL,
+    data TEXT NOT NULL  -- the full staStations record as JSON
+);
+CREATE TABLE resources (
+    type_id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,  -- ore, mineral, ice, moon_ore or gas
+    name TEXT NOT NULL,
+    volume REAL,
+    group_name TEXT
+);
+CREATE TABLE reprocessing_materials (
+    type_id INTEGER NOT NULL,
+    material_type_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (type_id, material_type_id)
+) WITHOUT ROWID;
+CREATE TABLE refined_materials (
+    type_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    volume REAL
+);
+"""
+
+# Created after the bulk insert; building them once is cheaper than maintaining them per row
+INDEXES = """
+CREATE INDEX idx_market_groups_parent ON market_groups (parent_group_id);
+CREATE INDEX idx_types_market_group ON types (market_group_id);
+CREATE INDEX idx_types_name ON types (name COLLATE NOCASE);
+CREATE INDEX idx_constellations_region ON constellations (region_id);
+CREATE INDEX idx_systems_constellation ON systems (constellation_id);
+CREATE INDEX idx_systems_region ON systems (region_id);
+CREATE INDEX idx_systems_name ON systems (name COLLATE NOCASE);
+CREATE INDEX idx_stations_system ON stations (solar_system_id);
+CREATE INDEX idx_stations_region ON stations (region_id);
+CREATE INDEX idx_resources_category ON resources (category);
+CREATE INDEX idx_reprocessing_material ON reprocessing_materials (material_type_id);
+"""
+
+# (output file, list key, category) for every reprocessable entry list
+RESOURCE_LISTS = [
+    ("ores.json", "ores", "ore"),
+    ("ores.json", "minerals", "mineral"),
+    ("ice.json", "ice", "ice"),
+    ("moon_ore.json", "moon_ores", "moon_ore"),
+    ("gas_clouds.json", "gas_clouds", "gas"),
+]
+
+# ─── Row Builders ──────────────────────────────────────────
+
+
+def _int_or_none(value):
+    return int(value) if value not in (None, "") else None
+
+
+def market_rows(index):
+    groups = [(
+        g["marketGroupID"], g["parentGroupID"], g["name"], _int_or_none(g["iconID"]),
+        g["iconFile"] or None, int(g["hasTypes"]),
+    ) for g in index.market_groups().values()]
+    types = [(
+        type_id, t["typeName"], t["marketGroupID"], _int_or_none(t["iconID"]),
+        t["iconFile"] or None, t.get("volume"), t.get("mass"), int(bool(t.get("published"))),
+    ) for type_id, t in index.types().items()]
+    return groups, types
+
+
+def location_rows(index):
+    regions, constellations, systems, stations = {}, {}, [], []
+    for system_id, path in index.systems().items():
+        regions[path["regionID"]] = (path["regionID"], path["region"])
+        constellations[path["constellationID"]] = (
+            path["constellationID"], path["regionID"], path["constellation"])
+        systems.append((system_id, path["constellationID"], path["regionID"], path["system"],
+                        path.get("solarSystemNameID"), path["security"]))
+    for station_id, station in index.stations().items():
+        path = station["location"]
+        record = {k: v for k, v in station.items() if k != "location"}
+        stations.append((
+            station_id, path["solarSystemID"], path["constellationID"], path["regionID"],
+            record.get("stationName"), record.get("stationTypeID"), record.get("corporationID"),
+            record.get("security"), record.get("reprocessingEfficiency"),
+            record.get("reprocessingStationsTake"), record.get("x"), record.get("y"), record.get("z"),
+            json.dumps(record, separators=(",", ":")),
+        ))
+    return list(regions.values()), list(constellations.values()), systems, stations
+
+
+def resource_rows(directory, ext=None):
+    resources, materials = {}, {}
+    loaded = {}
+    for filename, key, category in RESOURCE_LISTS:
+        if filename not in loaded:
+            loaded[filename] = load_output(directory, filename, ext)
+        for entry in loaded[filename].get(key, []):
+            type_id = entry["typeID"]
+            resources[type_id] = (type_id, category, entry["name"], entry.get("volume"),
+                                  entry.get("group"))
+            for material in entry.get("refined_output", []):
+                materials[(type_id, material["typeID"])] = (
+                    type_id, material["typeID"], material["quantity"])
+    refined = [(item["typeID"], item["name"], item.get("volume"))
+               for item in load_output(directory, "refined_outputs.json", ext)]
+    return list(resources.values()), list(materials.values()), refined
+
+# ─── Export ────────────────────────────────────────────────
+
+
+def export_sqlite(directory=".", db_path=SQLITE_PATH, ext=None):
+    """Write the extractor outputs in directory into one indexed SQLite file.
+
+    Outputs that are missing leave their tables empty. Rows go in as one
+    transaction, then the indexes are built. The database is written under
+    a temporary name that is swapped in at the end (or removed on failure),
+    so readers never see a half-written file. ext is the compression
+    suffix the outputs were written with (see load_output).
+    """
+    print(f"\n🗄  Exporting SQLite database {db_path}...")
+    index = SDEIndex(directory, ext)
+    tmp = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    conn = sqlite3.connect(tmp)
+    try:
+        try:
+            # A fresh temp file needs no crash safety until it is renamed into place
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+            counts = {}
+
+            def insert(table, rows):
+                if not rows:
+                    counts[table] = 0
+                    return
+                marks = ", ".join("?" * len(rows[0]))
+                conn.executemany(f"INSERT INTO {table} VALUES ({marks})", rows)
+                counts[table] = len(rows)
+
+            with conn:
+                try:
+                    groups, types = market_rows(index)
+                    insert("market_groups", groups)
+                    insert("types", types)
+                except FileNotFoundError as e:
+                    print(f"⚠️ Skipping market tables: {e}")
+                try:
+                    regions, constellations, systems, stations = location_rows(index)
+                    insert("regions", regions)
+                    insert("constellations", constellations)
+                    insert("systems", systems)
+                    insert("stations", stations)
+                except FileNotFoundError as e:
+                    print(f"⚠️ Skipping location tables: {e}")
+                try:
+                    resources, materials, refined = resource_rows(directory, ext)
+                    insert("resources", resources)
+                    insert("reprocessing_materials", materials)
+                    insert("refined_materials", refined)
+                except FileNotFoundError as e:
+                    print(f"⚠️ Skipping resource tables: {e}")
+            # executescript commits on its own, so indexes come after the insert transaction
+            conn.executescript(INDEXES)
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        os.replace(tmp, db_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    for table, count in counts.items():
+        print(f"   {table:<24} {count:>8} rows")
+    print(f"💾 Exported: {db_path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export extractor outputs to SQLite.")
+    parser.add_argument("--dir", default=".", help="directory holding the extractor outputs")
+    parser.add_argument("-o", "--output", default=SQLITE_PATH)
+    args = parser.parse_args(argv)
+    export_sqlite(args.dir, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())